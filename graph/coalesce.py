@@ -0,0 +1,81 @@
+# graph/coalesce.py
+from typing import Any, Callable, Dict, Optional
+from utils.single_flight import SingleFlight, AsyncSingleFlight
+
+# Shared state schema
+State = Dict[str, Any]
+
+# Slots that change what an action node produces
+SLOT_KEYS = ("metric_name", "dates", "target_date", "target_dates")
+# Keys a coalesced request copies from the shared execution
+SHARED_RESULT_KEYS = ("result", "response")
+
+workflow_flight = SingleFlight(name="workflow")
+async_workflow_flight = AsyncSingleFlight(name="async-workflow")
+
+def _normalize_slot(value):
+    if isinstance(value, str):
+        return " ".join(value.lower().split())
+    if isinstance(value, (list, tuple, set)):
+        return tuple(sorted(_normalize_slot(v) for v in value))
+    return value
+
+def coalesce_key(intent: str, state: State, dataset_version: Optional[str] = None) -> tuple:
+    """
+    Key identifying requests that would produce the same answer:
+    (intent, normalized slots, channel/thread scope, dataset version).
+    Thread summaries are scoped to their thread and ignore the wording, since
+    they only read the thread. Data answers are scoped to the channel; when no
+    slots were extracted the normalized request text stands in for them, so
+    different questions never share an answer.
+    """
+    if intent == "summarize_thread":
+        return (intent, (), (state.get("channel_id"), state.get("thread_ts")), dataset_version)
+
+    slots = tuple((k, _normalize_slot(state[k])) for k in SLOT_KEYS if state.get(k))
+    if not slots:
+        slots = (("text", _normalize_slot(state.get("text") or "")),)
+    return (intent, slots, (state.get("channel_id"),), dataset_version)
+
+def route_key(state: State) -> Optional[tuple]:
+    """
+    Worker-pool routing key, computed before classification: requests that
+    can end up with the same coalesce_key must run in the same worker
+    process, since each process has its own single-flight table. Bot
+    mentions inside a thread (likely summaries) route by thread, shared
+    files by content hash, everything else by channel + normalized text.
+    """
+    if state.get("file_sha256"):
+        return ("file", state["file_sha256"])
+    if state.get("prefetch_thread"):
+        return ("thread", state.get("channel_id"), state.get("thread_ts"))
+    text = _normalize_slot(state.get("text") or "")
+    return ("text", state.get("channel_id"), text) if text else None
+
+def coalesced(intent: str, node: Callable[[State], State],
+              dataset_version: Optional[Callable[[], str]] = None) -> Callable[[State], State]:
+    """
+    Wrap an action node so concurrent duplicate requests share one execution.
+    Each requester keeps its own state (and so its own reply thread) and only
+    copies SHARED_RESULT_KEYS from the shared result.
+    """
+    def run(state: State) -> State:
+        key = coalesce_key(intent, state, dataset_version() if dataset_version else None)
+        shared, is_leader = workflow_flight.do(key, lambda: node(dict(state)))
+        if is_leader:
+            return shared
+        state.update({k: shared[k] for k in SHARED_RESULT_KEYS if k in shared})
+        return state
+    return run
+
+def acoalesced(intent: str, node: Callable[[State], Any],
+               dataset_version: Optional[Callable[[], str]] = None) -> Callable[[State], Any]:
+    """Async counterpart of coalesced() for async nodes."""
+    async def run(state: State) -> State:
+        key = coalesce_key(intent, state, dataset_version() if dataset_version else None)
+        shared, is_leader = await async_workflow_flight.do(key, lambda: node(dict(state)))
+        if is_leader:
+            return shared
+        state.update({k: shared[k] for k in SHARED_RESULT_KEYS if k in shared})
+        return state
+    return run
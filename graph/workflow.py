@@ -1,14 +1,34 @@
 # graph/workflow.py
-from typing import Dict, Any
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable
 from langgraph.graph import StateGraph, END
-from nodes.classify_node import classify_node
-from tools.summarize_thread import summarize_thread_node
-from tools.lookup import lookup_node
-from tools.publish import publish_node
+from nodes.classify_node import classify_node, aclassify_node
+from tools.summarize_thread import summarize_thread_node, asummarize_thread_node
+from tools.summarize_file import summarize_file_node
+from tools.lookup import lookup_node, dataset_version as lookup_dataset_version
+from tools.publish import publish_node, dataset_version as publish_dataset_version
+from graph.coalesce import coalesced, acoalesced
+from utils.prefetch import start_prefetch, start_async_prefetch
 
 # Shared state schema
 State = Dict[str, Any]
 
+# pandas / matplotlib / xlsxwriter work in the async graph runs here,
+# so the event loop keeps serving other conversations meanwhile
+_offload_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("ASYNC_OFFLOAD_THREADS", "4")),
+    thread_name_prefix="offload",
+)
+
+def offloaded(node: Callable[[State], State]) -> Callable[[State], Any]:
+    """Run a blocking (CPU / boto3) node on the offload executor from the async graph."""
+    async def run(state: State) -> State:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_offload_executor, node, state)
+    return run
+
 def route_based_on_intent(state: State) -> str:
     """Decide next node based on classified intent."""
     intent = state.get("intent")
@@ -18,19 +38,22 @@ def route_based_on_intent(state: State) -> str:
         return "lookup"
     elif intent == "publish":
         return "publish"
+    elif intent == "file summary":
+        return "summarize_file"
     else:
         # Add a fallback response
         state["result"] = f"⚠️ Unknown intent: {intent}"
         return END
 
-def build_graph():
+def _compile(classify, summarize_thread, lookup, publish, summarize_file):
     graph = StateGraph(State)
 
     # Add nodes
-    graph.add_node("classify", classify_node)
-    graph.add_node("summarize_thread", summarize_thread_node)
-    graph.add_node("lookup", lookup_node)
-    graph.add_node("publish", publish_node)
+    graph.add_node("classify", classify)
+    graph.add_node("summarize_thread", summarize_thread)
+    graph.add_node("lookup", lookup)
+    graph.add_node("publish", publish)
+    graph.add_node("summarize_file", summarize_file)
 
     # Entry point
     graph.set_entry_point("classify")
@@ -42,5 +65,60 @@ def build_graph():
     graph.add_edge("summarize_thread", END)
     graph.add_edge("lookup", END)
     graph.add_edge("publish", END)
+    graph.add_edge("summarize_file", END)
 
     return graph.compile()
+
+def build_graph():
+    # Action nodes coalesce identical in-flight requests
+    return _compile(
+        classify_node,
+        coalesced("summarize_thread", summarize_thread_node),
+        coalesced("lookup", lookup_node, lookup_dataset_version),
+        coalesced("publish", publish_node, publish_dataset_version),
+        # Deduplicated by content hash (profile/summary artifacts) instead
+        summarize_file_node,
+    )
+
+def build_async_graph():
+    """
+    Same graph for asyncio: run with arun_workflow / ainvoke.
+    LLM and Slack I/O are awaited; pandas/plotting nodes run on an executor.
+    """
+    return _compile(
+        aclassify_node,
+        acoalesced("summarize_thread", asummarize_thread_node),
+        acoalesced("lookup", offloaded(lookup_node), lookup_dataset_version),
+        acoalesced("publish", offloaded(publish_node), publish_dataset_version),
+        offloaded(summarize_file_node),
+    )
+
+def run_workflow(workflow, state: State, slack_client=None) -> State:
+    """
+    Invoke a compiled workflow with per-process handles injected into state.
+    Used by both the in-process listener and the worker processes.
+
+    Thread history is prefetched while classify runs (see start_prefetch) and
+    handed to nodes as state["prefetch"]; unused prefetches are cancelled.
+    """
+    prefetch = None
+    if slack_client is not None:
+        prefetch = start_prefetch(state, slack_client)
+        state = {**state, "slack_client": slack_client, "prefetch": prefetch}
+    try:
+        return workflow.invoke(state)
+    finally:
+        if prefetch:
+            prefetch.cancel()
+
+async def arun_workflow(workflow, state: State, slack_client=None) -> State:
+    """run_workflow for the async graph; slack_client is a utils.slack_client.AsyncSlackClient."""
+    prefetch = None
+    if slack_client is not None:
+        prefetch = start_async_prefetch(state, slack_client)
+        state = {**state, "slack_client": slack_client, "prefetch": prefetch}
+    try:
+        return await workflow.ainvoke(state)
+    finally:
+        if prefetch:
+            prefetch.cancel()
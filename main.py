@@ -1,14 +1,37 @@
 # main.py
-from langgraph.graph import StateGraph
-from state import State
-from nodes.slack_listener import SlackListenerNode
-from nodes.classify import classify  # your GPT-4o intent classifier
+# Graph/listener imports live under __main__: spawned workers re-import this
+# module as __mp_main__ and must not load the tool datasets twice
+import asyncio
+import os
 
-graph = StateGraph(State)
-graph.add_node("classify", classify)
-graph.set_entry_point("classify")
+# 1 = serve every conversation from one asyncio event loop (ignores WORKER_PROCESSES)
+ASYNC_MODE = os.environ.get("ASYNC_MODE", "0") == "1"
+# 0 = run the workflow inside the listener process (single-core)
+WORKER_PROCESSES = int(os.environ.get("WORKER_PROCESSES", "0"))
 
-workflow = graph.compile()
+if __name__ == "__main__":
+    if ASYNC_MODE:
+        from graph.workflow import build_async_graph
+        from nodes.async_slack_listener import AsyncSlackListenerNode
 
-slack_listener = SlackListenerNode(workflow)
-slack_listener.start()
+        slack_listener = AsyncSlackListenerNode(build_async_graph())
+        asyncio.run(slack_listener.start_async())
+    else:
+        from nodes.slack_listener import SlackListenerNode
+        from utils.worker_pool import WorkerPool
+
+        if WORKER_PROCESSES > 0:
+            # Listener + workers share the app's Slack rate limits (env is inherited by workers)
+            os.environ.setdefault("SLACK_PROCESSES", str(WORKER_PROCESSES + 1))
+            # Workers build their own graph; the listener only dispatches
+            worker_pool = WorkerPool(WORKER_PROCESSES)
+            worker_pool.start()
+            workflow = None
+        else:
+            from graph.workflow import build_graph
+
+            worker_pool = None
+            workflow = build_graph()
+
+        slack_listener = SlackListenerNode(workflow, worker_pool=worker_pool)
+        slack_listener.start()
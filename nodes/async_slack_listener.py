@@ -0,0 +1,115 @@
+# nodes/async_slack_listener.py
+import asyncio, signal
+from typing import Dict, Any
+from slack_bolt.async_app import AsyncApp
+from slack_bolt.adapter.socket_mode.async_handler import AsyncSocketModeHandler
+from nodes.slack_listener_base import SlackListenerBase
+from utils.slack_client import AsyncSlackClient
+from utils.file_cache import reply_text
+from graph.workflow import arun_workflow
+
+class AsyncSlackListenerNode(SlackListenerBase):
+    """
+    asyncio version of SlackListenerNode.
+    Every Slack event is handled as a task on one event loop and runs the
+    async graph (see graph.workflow.build_async_graph) via ainvoke.
+    Slack calls go through AsyncSlackClient (aiohttp, asyncio rate-limit
+    waits) sharing budgets with the process's SlackClient; only file cache
+    and download work runs via asyncio.to_thread.
+    """
+    def __init__(self, workflow, allowed_channels=None):
+        super().__init__(allowed_channels)
+
+        self.app = AsyncApp(token=self.slack_bot_token)
+        self.aslack = AsyncSlackClient(self.slack)
+        self.workflow = workflow  # async LangGraph workflow
+
+        self._handler = None
+        self._inflight = set()
+
+        self._register_handlers()
+
+    def _register_handlers(self):
+        @self.app.event("message")
+        @self.app.event("app_mention")
+        async def handle_message(event):
+            await self._tracked(self._handle_message_event(event))
+
+        @self.app.event("file_shared")
+        async def handle_file(event):
+            await self._tracked(self._handle_file_shared_event(event))
+
+    async def _tracked(self, coro):
+        """Run a handler while recording it as in-flight (for graceful drain)."""
+        task = asyncio.current_task()
+        self._inflight.add(task)
+        try:
+            await coro
+        finally:
+            self._inflight.discard(task)
+
+    async def _reply(self, channel: str, thread_ts: str, text: str):
+        await self.aslack.chat_postMessage(channel=channel, thread_ts=thread_ts, text=text, merge=True)
+
+    async def _handle_message_event(self, event: Dict[str, Any]):
+        state = self._message_state(event)
+        if state is None: return
+
+        # Invoke LangGraph workflow
+        result = await arun_workflow(self.workflow, state, self.aslack)
+        text = reply_text(result)
+        if text:
+            await self._reply(state["channel_id"], state["thread_ts"], text)
+
+    async def _aresolve_file(self, file_id: str) -> Dict[str, Any]:
+        """_resolve_file with files.info awaited on the event loop."""
+        entry = await asyncio.to_thread(self.file_cache.get_metadata, file_id)
+        if entry:
+            return entry["metadata"]
+
+        file_meta = (await self.aslack.files_info(file=file_id))["file"]
+        await asyncio.to_thread(self.file_cache.put_metadata, file_id, file_meta)
+        return file_meta
+
+    async def _handle_file_shared_event(self, event: Dict[str, Any]):
+        try:
+            file_id = event.get("file", {}).get("id")
+            file_meta = await self._aresolve_file(file_id)
+            state, cached_reply = await asyncio.to_thread(self._file_state_for, event, file_id, file_meta)
+
+            # Identical content already processed -> replay the stored result
+            if cached_reply:
+                await self._reply(state["channel_id"], state["thread_ts"], cached_reply)
+                return
+
+            result = await arun_workflow(self.workflow, state, self.aslack)
+            text = await asyncio.to_thread(self._file_result_reply, state, result)
+            if text:
+                await self._reply(state["channel_id"], state["thread_ts"], text)
+
+        except Exception as e:
+            await self._reply(event.get("channel"), event.get("ts"), f"⚠ File handling error: {str(e)}")
+
+    async def start_async(self):
+        print("🤖 Slack bot is starting via LangGraph (asyncio)...")
+        self._handler = AsyncSocketModeHandler(self.app, self.slack_app_token)
+        await self._handler.connect_async()
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+
+        await stop.wait()
+        print("🛑 Shutting down SlackListener...")
+        await self.stop()
+
+    async def stop(self, drain_timeout: float = 30.0):
+        """Stop receiving events, then wait for in-flight conversations to finish."""
+        if self._handler:
+            await self._handler.close_async()
+        if self._inflight:
+            print(f"⏳ Draining {len(self._inflight)} in-flight events...")
+            await asyncio.wait(list(self._inflight), timeout=drain_timeout)
+        await self.aslack.close()
+        print("👋 SlackListener stopped")
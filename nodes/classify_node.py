@@ -1,9 +1,10 @@
 # nodes/classify_node.py
 from typing import Dict, Any
 from langgraph.graph import node
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 from utils.context_loader import load_channel_context
 from utils.secrets_loader import load_secrets
+from utils.prompt_builder import PromptBuilder
 
 # Load OpenAI API key once
 try:
@@ -12,6 +13,44 @@ except Exception as e:
     raise RuntimeError(f"Failed to load secrets for OpenAI: {e}")
 
 client = OpenAI(api_key=secrets.get("OPENAI_API_KEY"))
+async_client = AsyncOpenAI(api_key=secrets.get("OPENAI_API_KEY"))
+
+# Static instructions first, channel context after: keeps the prompt prefix cacheable
+prompt_builder = PromptBuilder(
+    node="classify",
+    instructions="""
+You are a classifier.
+Your job is to assign exactly one intent from this list:
+
+- create_jira_ticket → when user asks to create a Jira ticket
+- update_jira_ticket → when user asks to update an existing Jira ticket
+- summarize_thread → when user asks for a summary of the messages in a Slack thread
+- file summary → when user asks for a summary of a file shared in a Slack thread
+- publish → when user asks to publish data
+- lookup → when user asks to retrieve a data point
+- unknown → if the request does not clearly match any of the above
+
+Always return a JSON: {"intent": "<one_of_the_above>"}.
+""",
+    context_header="Channel Context (may affect classification):",
+    max_prompt_tokens=2000,
+    context_budget=1200,
+)
+
+def _build_messages(state: Dict[str, Any]):
+    """Prompt messages for the classifier, or None when there is no text."""
+    text = state.get("text", "").strip()
+    if not text:
+        return None
+
+    channel_id = state.get("channel_id")
+    channel_context = load_channel_context(channel_id) if channel_id else ""
+
+    return prompt_builder.build(f"Text: {text}", context=channel_context)
+
+def _intent_without_text(state: Dict[str, Any]) -> str:
+    """A file shared without a question is a request to summarize it."""
+    return "file summary" if state.get("file_id") else "unknown"
 
 @node
 def classify_node(state: Dict[str, Any]) -> Dict[str, Any]:
@@ -22,50 +61,52 @@ def classify_node(state: Dict[str, Any]) -> Dict[str, Any]:
     Input:
         state["text"] - user message text
         state["channel_id"] (optional) - Slack channel for context
+        state["file_id"] (optional) - shared file; with no text -> "file summary"
 
     Output:
         state["intent"] - chosen intent
     """
-    text = state.get("text", "").strip()
-    if not text:
-        state["intent"] = "unknown"
+    messages = _build_messages(state)
+    if messages is None:
+        state["intent"] = _intent_without_text(state)
         return state
 
-    channel_id = state.get("channel_id")
-    channel_context = load_channel_context(channel_id) if channel_id else ""
-
-    system_prompt = f"""
-    You are a classifier.
-    Your job is to assign exactly one intent from this list:
+    try:
+        response = client.chat.completions.create(
+            model="gpt-4o",
+            messages=messages,
+            response_format={"type": "json_object"}
+        )
+        prompt_builder.record_usage(response)
 
-    - create_jira_ticket → when user asks to create a Jira ticket
-    - update_jira_ticket → when user asks to update an existing Jira ticket
-    - summarize_thread → when user asks for a summary of the messages in a Slack thread
-    - file summary → when user asks for a summary of a file shared in a Slack thread
-    - publish → when user asks to publish data
-    - lookup → when user asks to retrieve a data point
-    - unknown → if the request does not clearly match any of the above
+        intent = response.choices[0].message.parsed.get("intent", "unknown")
+    except Exception as e:
+        intent = "unknown"
+        print(f"⚠ classify_node error: {e}")
 
-    Channel Context (may affect classification):
-    {channel_context}
+    state["intent"] = intent
+    return state
 
-    Always return a JSON: {{"intent": "<one_of_the_above>"}}.
-    """
+@node
+async def aclassify_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Async variant of classify_node (AsyncOpenAI), for the async graph."""
+    messages = _build_messages(state)
+    if messages is None:
+        state["intent"] = _intent_without_text(state)
+        return state
 
     try:
-        response = client.chat.completions.create(
+        response = await async_client.chat.completions.create(
             model="gpt-4o",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Text: {text}"}
-            ],
+            messages=messages,
             response_format={"type": "json_object"}
         )
+        prompt_builder.record_usage(response)
 
         intent = response.choices[0].message.parsed.get("intent", "unknown")
     except Exception as e:
         intent = "unknown"
-        print(f"⚠ classify_node error: {e}")
+        print(f"⚠ aclassify_node error: {e}")
 
     state["intent"] = intent
     return state
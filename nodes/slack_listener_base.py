@@ -0,0 +1,105 @@
+# nodes/slack_listener_base.py
+from typing import Any, Dict, Optional, Tuple
+from utils.aws_secrets import load_secrets
+from utils.file_cache import SlackFileCache, reply_text
+from utils.slack_client import get_slack_client
+from state import State
+
+class SlackListenerBase:
+    """
+    Event -> State logic shared by SlackListenerNode and AsyncSlackListenerNode.
+    Subclasses only add the Slack app, dispatching and reply I/O.
+
+    Everything here is blocking (Slack Web API via the shared rate-limited
+    client, local file cache); the async listener resolves file metadata with
+    its async client and runs only the cache/download work via asyncio.to_thread.
+    """
+    def __init__(self, allowed_channels=None):
+        try:
+            secrets = load_secrets()
+        except Exception as e:
+            raise RuntimeError(f"Failed to load secrets from AWS: {e}")
+
+        self.slack_bot_token = secrets.get("SLACK_BOT_TOKEN")
+        self.slack_app_token = secrets.get("SLACK_APP_TOKEN")
+        self.bot_user_id = secrets.get("BOT_USER_ID")
+
+        if not all([self.slack_bot_token, self.slack_app_token, self.bot_user_id]):
+            raise ValueError("Missing Slack credentials from AWS Secrets Manager")
+
+        # Rate-limited, pooled Web API client used for all replies and lookups
+        self.slack = get_slack_client(self.slack_bot_token)
+        self.allowed_channels = allowed_channels or []
+        self.file_cache = SlackFileCache()
+        self._seen = set()
+
+    def _is_duplicate(self, event: Dict[str, Any]):
+        key = (event.get("channel"), event.get("ts"), event.get("text"))
+        if key in self._seen: return True
+        self._seen.add(key)
+        return False
+
+    def _mentions_bot(self, event: Dict[str, Any]) -> bool:
+        return f"<@{self.bot_user_id}>" in event.get("text", "")
+
+    def _extract_user_query(self, event: Dict[str, Any]) -> str:
+        text = event.get("text", "")
+        bot_mention = f"<@{self.bot_user_id}>"
+        return text.replace(bot_mention, "").strip()
+
+    def _message_state(self, event: Dict[str, Any]) -> Optional[State]:
+        """State for a message event, or None if the event should be ignored."""
+        if event.get("subtype") == "bot_message": return None
+        if self.allowed_channels and event.get("channel") not in self.allowed_channels: return None
+        if self._is_duplicate(event): return None
+
+        return {
+            "text": self._extract_user_query(event),
+            "channel_id": event["channel"],
+            # Thread parent for in-thread mentions, else the message itself
+            "thread_ts": event.get("thread_ts") or event.get("ts") or event.get("event_ts"),
+            # Bot mentioned inside a thread -> likely a summary, fetch the thread during classify
+            "prefetch_thread": bool(event.get("thread_ts")) and self._mentions_bot(event),
+        }
+
+    def _resolve_file(self, file_id: str) -> Dict[str, Any]:
+        """Metadata for a Slack file; `files_info` is skipped while the cached entry is fresh."""
+        entry = self.file_cache.get_metadata(file_id)
+        if entry:
+            return entry["metadata"]
+
+        file_meta = self.slack.files_info(file=file_id)["file"]
+        self.file_cache.put_metadata(file_id, file_meta)
+        return file_meta
+
+    def _file_state(self, event: Dict[str, Any]) -> Tuple[State, Optional[str]]:
+        """
+        Returns (state, cached_reply): cached_reply is the stored answer when
+        identical content was already processed, else None (run the workflow).
+        The file is hashed by content (downloaded once, then served from the
+        cache), so the same report re-shared under a new file id still hits.
+        """
+        file_id = event.get("file", {}).get("id")
+        return self._file_state_for(event, file_id, self._resolve_file(file_id))
+
+    def _file_state_for(self, event: Dict[str, Any], file_id: str,
+                        file_meta: Dict[str, Any]) -> Tuple[State, Optional[str]]:
+        """_file_state once the file metadata is known (no Slack API calls)."""
+        sha256, _ = self.file_cache.fetch_bytes(
+            file_id, file_meta, self.slack_bot_token, session=self.slack.session
+        )
+        state: State = {
+            "file_id": file_id,
+            "file_metadata": file_meta,
+            "file_sha256": sha256,
+            "channel_id": event.get("channel"),
+            "thread_ts": event.get("ts") or event.get("event_ts"),
+        }
+
+        cached = self.file_cache.get_result(sha256)
+        return state, reply_text(cached) if cached else None
+
+    def _file_result_reply(self, state: State, result: Dict[str, Any]) -> Optional[str]:
+        """Store the workflow result against the file's content hash and return the reply text."""
+        self.file_cache.put_result(state["file_sha256"], result)
+        return reply_text(result)
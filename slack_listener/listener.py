@@ -1,102 +1,115 @@
 # nodes/slack_listener.py
-import json, time, signal, sys
+import json, time, signal, sys, threading
 from slack_bolt import App
 from slack_bolt.adapter.socket_mode import SocketModeHandler
-from utils.aws_secrets import load_secrets
+from nodes.slack_listener_base import SlackListenerBase
+from utils.file_cache import reply_text
+from graph.coalesce import route_key
 from typing import Dict, Any
 from state import State
 
-class SlackListenerNode:
+class SlackListenerNode(SlackListenerBase):
     """
     LangGraph-compatible Slack listener node.
     It converts Slack events -> State, invokes the workflow,
     and posts responses back to Slack.
-    """
-    def __init__(self, workflow, allowed_channels=None):
-        try:
-            secrets = load_secrets()
-        except Exception as e:
-            raise RuntimeError(f"Failed to load secrets from AWS: {e}")
 
-        self.slack_bot_token = secrets.get("SLACK_BOT_TOKEN")
-        self.slack_app_token = secrets.get("SLACK_APP_TOKEN")
-        self.bot_user_id = secrets.get("BOT_USER_ID")
-
-        if not all([self.slack_bot_token, self.slack_app_token, self.bot_user_id]):
-            raise ValueError("Missing Slack credentials from AWS Secrets Manager")
+    With a `worker_pool`, workflow executions are dispatched to worker
+    processes instead of running in the listener's own process.
+    """
+    def __init__(self, workflow, allowed_channels=None, worker_pool=None):
+        super().__init__(allowed_channels)
 
         self.app = App(token=self.slack_bot_token)
-        self.allowed_channels = allowed_channels or []
-        self.workflow = workflow  # LangGraph workflow
+        self.workflow = workflow  # LangGraph workflow (unused when worker_pool is set)
+        self.worker_pool = worker_pool
+
+        self._handler = None
+        self._stopped = threading.Event()
 
         self._register_handlers()
 
     def _register_handlers(self):
         @self.app.event("message")
         @self.app.event("app_mention")
-        def handle_message(event, say):
-            self._handle_message_event(event, say)
+        def handle_message(event):
+            self._handle_message_event(event)
 
         @self.app.event("file_shared")
-        def handle_file(event, say):
-            self._handle_file_shared_event(event, say)
-
-    def _is_duplicate(self, event: Dict[str, Any], seen=set()):
-        key = (event.get("channel"), event.get("ts"), event.get("text"))
-        if key in seen: return True
-        seen.add(key)
-        return False
-
-    def _extract_user_query(self, event: Dict[str, Any]) -> str:
-        text = event.get("text", "")
-        bot_mention = f"<@{self.bot_user_id}>"
-        return text.replace(bot_mention, "").strip()
-
-    def _handle_message_event(self, event: Dict[str, Any], say):
-        if event.get("subtype") == "bot_message": return
-        if self.allowed_channels and event.get("channel") not in self.allowed_channels: return
-        if self._is_duplicate(event): return
-
-        user_query = self._extract_user_query(event)
-        state: State = {
-            "text": user_query,
-            "channel_id": event["channel"],
-            "thread_ts": event.get("ts") or event.get("event_ts"),
-        }
+        def handle_file(event):
+            self._handle_file_shared_event(event)
 
-        # Invoke LangGraph workflow
-        result = self.workflow.invoke(state)
+    def _reply(self, channel: str, thread_ts: str, text: str):
+        """Post into a thread; replies queued behind an in-flight post to it are merged."""
+        self.slack.chat_postMessage(channel=channel, thread_ts=thread_ts, text=text, merge=True)
+
+    def _handle_message_event(self, event: Dict[str, Any]):
+        state = self._message_state(event)
+        if state is None: return
 
-        if result.get("response"):
-            say(text=result["response"], thread_ts=state["thread_ts"])
+        def reply(result):
+            text = reply_text(result)
+            if text:
+                self._reply(state["channel_id"], state["thread_ts"], text)
 
-    def _handle_file_shared_event(self, event: Dict[str, Any], say):
+        # Invoke LangGraph workflow
+        self._dispatch(state, reply)
+
+    def _dispatch(self, state: State, reply):
+        """Run the workflow in-process or on the worker pool, then call reply(result)."""
+        if self.worker_pool:
+            # Duplicates must share a worker to be coalesced there
+            self.worker_pool.submit(state, reply, route_key(state))
+        else:
+            # Imported here: graph.workflow loads the tool datasets, which a
+            # dispatch-only listener (and spawned workers re-importing main) must not
+            from graph.workflow import run_workflow
+            reply(run_workflow(self.workflow, state, self.slack))
+
+    def _handle_file_shared_event(self, event: Dict[str, Any]):
         try:
-            file_id = event.get("file", {}).get("id")
-            file_info = self.app.client.files_info(file=file_id)
-            file_meta = file_info["file"]
+            state, cached_reply = self._file_state(event)
+
+            # Identical content already processed -> replay the stored result
+            if cached_reply:
+                self._reply(state["channel_id"], state["thread_ts"], cached_reply)
+                return
 
-            state: State = {
-                "file_metadata": file_meta,
-                "channel_id": event.get("channel"),
-                "thread_ts": event.get("ts") or event.get("event_ts"),
-            }
+            def reply(result):
+                text = self._file_result_reply(state, result)
+                if text:
+                    self._reply(state["channel_id"], state["thread_ts"], text)
 
-            result = self.workflow.invoke(state)
-            if result.get("response"):
-                say(text=result["response"], thread_ts=state["thread_ts"])
+            self._dispatch(state, reply)
 
         except Exception as e:
-            say(text=f"⚠ File handling error: {str(e)}", thread_ts=event.get("ts"))
+            self._reply(event.get("channel"), event.get("ts"), f"⚠ File handling error: {str(e)}")
 
     def start(self):
         print("🤖 Slack bot is starting via LangGraph...")
-        handler = SocketModeHandler(self.app, self.slack_app_token)
-        handler.start()
+        self._handler = SocketModeHandler(self.app, self.slack_app_token)
+        self._handler.connect()
+        _active_listeners.append(self)
+        while not self._stopped.wait(1.0):
+            pass
+        print("👋 SlackListener stopped")
+
+    def stop(self, drain_timeout: float = 30.0):
+        """Stop receiving events, drain in-flight work, then release start()."""
+        if self._handler:
+            self._handler.close()
+        if self.worker_pool:
+            self.worker_pool.drain(timeout=drain_timeout)
+        self._stopped.set()
+
+_active_listeners = []
 
 def shutdown_handler(signum, frame):
     print("🛑 Shutting down SlackListener...")
-    sys.exit(0)
+    if not _active_listeners:
+        sys.exit(0)
+    while _active_listeners:
+        _active_listeners.pop().stop()
 
 signal.signal(signal.SIGINT, shutdown_handler)
 signal.signal(signal.SIGTERM, shutdown_handler)
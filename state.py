@@ -1,10 +1,14 @@
 # state.py
-from typing import TypedDict, Optional, Dict
+from typing import TypedDict, Optional, Dict, Any
 
 class State(TypedDict, total=False):
     text: str
     intent: str
     response: Optional[str]
     file_metadata: Optional[Dict]
+    file_id: Optional[str]
+    file_sha256: Optional[str]
     channel_id: str
     thread_ts: str
+    prefetch_thread: bool
+    prefetch: Optional[Any]
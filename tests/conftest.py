@@ -0,0 +1,6 @@
+# tests/conftest.py
+import os
+import sys
+
+# Make top-level packages (utils, graph, nodes, ...) importable from tests
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
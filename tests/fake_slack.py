@@ -0,0 +1,77 @@
+# tests/fake_slack.py
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+class FakeSlack:
+    """
+    Minimal local Slack Web API for tests: POST /api/<method> with form args.
+
+    Every call is recorded in `calls` as (method, params). Responses default
+    to {"ok": true, ...}; queue specific ones (429s, errors) with respond(),
+    and slow down a method with `delays[method] = seconds`.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.delays = {}
+        self._scripted = defaultdict(deque)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}/api/"
+
+    def respond(self, method, status=200, body=None, headers=None):
+        """Queue one response for the next call to `method`."""
+        self._scripted[method].append((status, body or {"ok": True}, headers or {}))
+
+    def posted_texts(self):
+        return [params.get("text") for method, params in self.calls if method == "chat.postMessage"]
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _reply(self, method, params):
+        with self._lock:
+            self.calls.append((method, params))
+            scripted = self._scripted[method].popleft() if self._scripted[method] else None
+        time.sleep(self.delays.get(method, 0))
+        if scripted:
+            return scripted
+        if method == "chat.postMessage":
+            return 200, {"ok": True, "channel": params.get("channel"), "ts": f"{time.time():.6f}",
+                         "message": {"text": params.get("text")}}, {}
+        return 200, {"ok": True}, {}
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                form = parse_qs(self.rfile.read(length).decode())
+                params = {k: v[0] for k, v in form.items()}
+                status, body, headers = fake._reply(self.path.rsplit("/", 1)[-1], params)
+
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,123 @@
+# tests/test_file_cache.py
+import os
+import time
+
+from utils.file_cache import SlackFileCache, reply_text
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeSession:
+    def __init__(self, content):
+        self.content = content
+        self.calls = 0
+
+    def get(self, url, headers=None, timeout=None):
+        self.calls += 1
+        return FakeResponse(self.content)
+
+
+def test_metadata_round_trip(tmp_path):
+    cache = SlackFileCache(str(tmp_path))
+    assert cache.get_metadata("F1") is None
+
+    cache.put_metadata("F1", {"id": "F1", "name": "report.csv"}, "abc")
+    entry = cache.get_metadata("F1")
+    assert entry["metadata"]["name"] == "report.csv"
+    assert entry["sha256"] == "abc"
+
+
+def test_identical_bytes_share_one_blob(tmp_path):
+    cache = SlackFileCache(str(tmp_path))
+    assert cache.put_bytes(b"same") == cache.put_bytes(b"same")
+    assert len(os.listdir(os.path.join(str(tmp_path), "blobs"))) == 1
+
+
+def test_lru_eviction_keeps_recently_used(tmp_path):
+    cache = SlackFileCache(str(tmp_path), max_bytes=250)
+    a = cache.put_bytes(b"a" * 100)
+    time.sleep(0.02)
+    b = cache.put_bytes(b"b" * 100)
+    time.sleep(0.02)
+    cache.get_bytes(a)  # a is now more recent than b
+    time.sleep(0.02)
+    c = cache.put_bytes(b"c" * 100)
+
+    assert cache.blob_path(a) is not None
+    assert cache.blob_path(b) is None
+    assert cache.blob_path(c) is not None
+
+
+def test_oversized_blob_is_not_cached(tmp_path):
+    cache = SlackFileCache(str(tmp_path), max_bytes=10)
+    small = cache.put_bytes(b"tiny")
+    big = cache.put_bytes(b"x" * 100)
+
+    assert cache.blob_path(big) is None
+    assert cache.blob_path(small) is not None
+
+
+def test_result_only_stored_for_answered_intents(tmp_path):
+    cache = SlackFileCache(str(tmp_path))
+    sha = cache.put_bytes(b"report")
+
+    assert not cache.put_result(sha, {"intent": "unknown", "result": "⚠️ Unknown intent: unknown"})
+    assert cache.get_result(sha) is None
+
+    assert cache.put_result(sha, {"intent": "file summary", "result": "3 rows", "slack_client": object()})
+    assert cache.get_result(sha) == {"intent": "file summary", "result": "3 rows"}
+
+
+def test_fetch_bytes_downloads_once_and_links_file_id(tmp_path):
+    cache = SlackFileCache(str(tmp_path))
+    meta = {"id": "F1", "url_private_download": "https://files.slack.com/F1"}
+    session = FakeSession(b"col\n1\n")
+
+    sha, data = cache.fetch_bytes("F1", meta, "xoxb", session=session)
+    sha_again, data_again = cache.fetch_bytes("F1", meta, "xoxb", session=session)
+
+    assert data == data_again == b"col\n1\n"
+    assert sha == sha_again
+    assert session.calls == 1
+    assert cache.get_metadata("F1")["sha256"] == sha
+
+
+def test_reply_text_prefers_response():
+    assert reply_text({"intent": "lookup", "result": "r", "response": "resp"}) == "resp"
+    assert reply_text({"intent": "lookup", "result": "r"}) == "r"
+    assert reply_text({"intent": "unknown", "result": "r"}) is None
+
+
+def test_metadata_expires_after_ttl(tmp_path):
+    cache = SlackFileCache(str(tmp_path), meta_ttl=60)
+    cache.put_metadata("F1", {"id": "F1", "channels": ["C1"]}, "abc")
+    path = os.path.join(str(tmp_path), "meta", "F1.json")
+
+    old = time.time() - 120
+    os.utime(path, (old, old))
+    cache.put_bytes(b"new content")  # eviction pass prunes expired metadata
+    assert not os.path.exists(path)
+
+    cache.put_metadata("F2", {"id": "F2"})
+    assert cache.get_metadata("F2") is not None
+    cache.meta_ttl = -1
+    assert cache.get_metadata("F2") is None  # stale entries are never replayed
+
+
+def test_new_file_id_with_identical_content_finds_stored_result(tmp_path):
+    cache = SlackFileCache(str(tmp_path))
+    session = FakeSession(b"col\n1\n")
+    meta = {"url_private_download": "https://files.slack.com/F"}
+
+    sha, _ = cache.fetch_bytes("F1", {**meta, "id": "F1"}, "xoxb", session=session)
+    cache.put_result(sha, {"intent": "file summary", "result": "1 row"})
+
+    reshared_sha, _ = cache.fetch_bytes("F2", {**meta, "id": "F2"}, "xoxb", session=session)
+    assert reshared_sha == sha
+    assert reply_text(cache.get_result(reshared_sha)) == "1 row"
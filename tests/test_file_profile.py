@@ -0,0 +1,34 @@
+# tests/test_file_profile.py
+import json
+
+from utils.file_profile import profile_file
+
+
+def test_csv_profile_has_shape_columns_and_sample():
+    data = b"metric,value\nusers,10\nactive,\nusers,30\n"
+    profile = profile_file(data, {"name": "report.csv", "filetype": "csv"})
+
+    assert profile["kind"] == "table"
+    assert profile["rows"] == 3
+    assert profile["columns"] == [
+        {"name": "metric", "dtype": profile["columns"][0]["dtype"], "nulls": 0},
+        {"name": "value", "dtype": "float64", "nulls": 1},
+    ]
+    assert profile["numeric_stats"]["value"]["max"] == 30
+    assert profile["sample"][0] == {"metric": "users", "value": "10.0"}
+    json.dumps(profile)  # stored as a JSON artifact
+
+
+def test_filetype_falls_back_to_extension():
+    profile = profile_file(b"a\tb\n1\t2\n", {"name": "data.tsv"})
+    assert profile["kind"] == "table"
+    assert [c["name"] for c in profile["columns"]] == ["a", "b"]
+
+
+def test_text_and_binary_profiles():
+    text = profile_file(b"line 1\nline 2", {"name": "notes.md", "filetype": "markdown"})
+    assert (text["kind"], text["lines"], text["preview"]) == ("text", 2, "line 1\nline 2")
+
+    binary = profile_file(b"\x89PNG", {"name": "chart.png", "filetype": "png"})
+    assert binary["kind"] == "binary"
+    assert binary["size_bytes"] == 4
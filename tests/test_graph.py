@@ -1 +1,102 @@
-#tests
+# tests/test_graph.py
+import asyncio
+import threading
+import time
+
+from graph.coalesce import acoalesced, coalesce_key, coalesced, route_key
+
+
+def test_different_questions_without_slots_do_not_coalesce():
+    a = coalesce_key("lookup", {"channel_id": "C1", "text": "How many users signed up?"})
+    b = coalesce_key("lookup", {"channel_id": "C1", "text": "How many users activated?"})
+    assert a != b
+
+
+def test_same_question_modulo_case_and_spacing_coalesces():
+    a = coalesce_key("lookup", {"channel_id": "C1", "text": "How many  users?"})
+    b = coalesce_key("lookup", {"channel_id": "C1", "text": "how many users?"})
+    assert a == b
+
+
+def test_slots_replace_text_in_key():
+    a = coalesce_key("lookup", {"channel_id": "C1", "text": "users on 1st", "metric_name": "Users", "dates": ["b", "a"]})
+    b = coalesce_key("lookup", {"channel_id": "C1", "text": "1st users pls", "metric_name": "users", "dates": ["a", "b"]})
+    assert a == b
+
+
+def test_key_scope_and_dataset_version():
+    state = {"channel_id": "C1", "text": "q"}
+    assert coalesce_key("lookup", state, "v1") != coalesce_key("lookup", state, "v2")
+    assert coalesce_key("lookup", state) != coalesce_key("lookup", {**state, "channel_id": "C2"})
+
+
+def test_thread_summaries_are_keyed_by_thread():
+    a = coalesce_key("summarize_thread", {"channel_id": "C1", "thread_ts": "1", "text": "summarize"})
+    b = coalesce_key("summarize_thread", {"channel_id": "C1", "thread_ts": "1", "text": "tl;dr?"})
+    c = coalesce_key("summarize_thread", {"channel_id": "C1", "thread_ts": "2", "text": "summarize"})
+    assert a == b
+    assert a != c
+
+
+def test_concurrent_duplicates_share_one_execution():
+    calls = []
+    started = threading.Event()
+
+    def node(state):
+        calls.append(state["thread_ts"])
+        started.set()
+        time.sleep(0.2)
+        state["result"] = "42"
+        return state
+
+    run = coalesced("lookup", node)
+    results = {}
+
+    def request(thread_ts):
+        results[thread_ts] = run({"channel_id": "C1", "text": "q", "thread_ts": thread_ts})
+
+    leader = threading.Thread(target=request, args=("1",))
+    leader.start()
+    started.wait()
+    request("2")
+    leader.join()
+
+    assert calls == ["1"]
+    assert results["2"] == {"channel_id": "C1", "text": "q", "thread_ts": "2", "result": "42"}
+
+
+def test_async_duplicates_share_one_execution():
+    calls = []
+
+    async def node(state):
+        calls.append(state["thread_ts"])
+        await asyncio.sleep(0.05)
+        state["result"] = "42"
+        return state
+
+    run = acoalesced("lookup", node)
+
+    async def main():
+        return await asyncio.gather(
+            run({"channel_id": "C1", "text": "q", "thread_ts": "1"}),
+            run({"channel_id": "C1", "text": "q", "thread_ts": "2"}),
+            run({"channel_id": "C1", "text": "other", "thread_ts": "3"}),
+        )
+
+    results = asyncio.run(main())
+    assert sorted(calls) == ["1", "3"]
+    assert [r["thread_ts"] for r in results] == ["1", "2", "3"]
+    assert all(r["result"] == "42" for r in results)
+
+
+def test_route_key_groups_requests_that_can_coalesce():
+    lookup = {"channel_id": "C1", "text": "How many users?", "thread_ts": "1"}
+    assert route_key(lookup) == route_key({**lookup, "text": "how many  users?", "thread_ts": "2"})
+    assert route_key(lookup) != route_key({**lookup, "channel_id": "C2"})
+
+    # Differently worded summaries of one thread share a worker
+    mention = {"channel_id": "C1", "thread_ts": "9", "prefetch_thread": True}
+    assert route_key({**mention, "text": "summarize"}) == route_key({**mention, "text": "tl;dr?"})
+
+    assert route_key({"file_sha256": "abc", "channel_id": "C1"}) == route_key({"file_sha256": "abc", "channel_id": "C2"})
+    assert route_key({"channel_id": "C1", "text": " "}) is None
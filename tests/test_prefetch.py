@@ -0,0 +1,71 @@
+# tests/test_prefetch.py
+import asyncio
+
+from utils.prefetch import prefetch_stats, start_async_prefetch, start_prefetch
+
+MENTION = {"channel_id": "C1", "thread_ts": "1.0", "prefetch_thread": True}
+
+
+class FakeClient:
+    def __init__(self):
+        self.calls = []
+
+    def conversations_replies(self, channel, ts):
+        self.calls.append((channel, ts))
+        return {"messages": [{"text": "hi"}]}
+
+
+class FakeAsyncClient:
+    def __init__(self):
+        self.calls = []
+        self.cancelled = False
+
+    async def conversations_replies(self, channel, ts):
+        self.calls.append((channel, ts))
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return {"messages": []}
+
+
+def test_only_flagged_thread_mentions_are_prefetched():
+    client = FakeClient()
+    assert start_prefetch({"channel_id": "C1", "thread_ts": "1.0"}, client) is None
+    assert start_prefetch({**MENTION, "thread_ts": None}, client) is None
+    assert client.calls == []
+
+
+def test_prefetched_replies_are_handed_to_get():
+    client = FakeClient()
+    before = prefetch_stats()
+    prefetch = start_prefetch(MENTION, client)
+
+    assert prefetch.get("thread_replies") == {"messages": [{"text": "hi"}]}
+    assert prefetch.get("thread_replies") is None  # consumed
+    assert client.calls == [("C1", "1.0")]
+    assert prefetch_stats()["used"] == before["used"] + 1
+
+
+def test_failed_prefetch_falls_back_to_none():
+    class FailingClient:
+        def conversations_replies(self, channel, ts):
+            raise RuntimeError("boom")
+
+    prefetch = start_prefetch(MENTION, FailingClient())
+    assert prefetch.get("thread_replies") is None
+
+
+def test_async_cancel_stops_the_request():
+    client = FakeAsyncClient()
+
+    async def main():
+        prefetch = start_async_prefetch(MENTION, client)
+        await asyncio.sleep(0)
+        prefetch.cancel()
+        await asyncio.sleep(0)
+
+    asyncio.run(main())
+    assert client.calls == [("C1", "1.0")]
+    assert client.cancelled
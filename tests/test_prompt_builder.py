@@ -0,0 +1,79 @@
+# tests/test_prompt_builder.py
+from utils.prompt_builder import PromptBuilder, count_tokens, fit_sections, split_sections, truncate_tokens
+
+CONTEXT = "\n\n".join(
+    ["Channel: #analytics"]
+    + [f"## Topic {i}\n" + " ".join(f"word{i}" for _ in range(60)) for i in range(10)]
+)
+
+
+def make_builder(**kwargs):
+    options = dict(node="test", instructions="Classify the text.", max_prompt_tokens=600, context_budget=300)
+    options.update(kwargs)
+    return PromptBuilder(**options)
+
+
+def test_split_sections_keeps_preamble_first():
+    sections = split_sections(CONTEXT)
+    assert sections[0] == "Channel: #analytics"
+    assert sections[1].startswith("## Topic 0")
+    assert len(sections) == 11
+
+
+def test_fit_sections_keeps_document_order_within_budget():
+    fitted = fit_sections(CONTEXT, 300)
+    assert count_tokens(fitted) <= 300
+    kept = split_sections(fitted)
+    assert kept == split_sections(CONTEXT)[: len(kept)]
+
+
+def test_context_prefix_is_identical_for_different_requests():
+    builder = make_builder()
+    short = builder.build("Text: topic 9?", context=CONTEXT)
+    long = builder.build("Text: " + "word9 " * 200, context=CONTEXT)
+    assert short[0]["content"] == long[0]["content"]
+    assert short[0]["content"].startswith("Classify the text.\n\nContext:\nChannel: #analytics")
+
+
+def test_long_request_drops_oldest_lines_not_context():
+    builder = make_builder()
+    request = "\n".join(f"line {i} " + "x" * 200 for i in range(40))
+    messages = builder.build(request, context=CONTEXT)
+
+    total = sum(count_tokens(m["content"]) for m in messages)
+    assert total <= builder.max_prompt_tokens
+    assert messages[1]["content"].endswith(request.splitlines()[-1])
+    assert builder.stats()["trimmed_calls"] == 1
+
+
+def test_small_context_is_used_whole():
+    builder = make_builder()
+    messages = builder.build("Text: hi", context="Channel: #general")
+    assert messages[0]["content"].endswith("Context:\nChannel: #general")
+    assert builder.stats()["trimmed_calls"] == 0
+
+
+def test_request_keeps_first_line_and_newest_lines():
+    builder = make_builder()
+    lines = ["- parent message"] + [f"- reply {i} " + "y" * 100 for i in range(50)]
+    request = builder._fit_request("\n".join(lines), 300)
+
+    kept = request.splitlines()
+    assert kept[0] == "- parent message"
+    assert kept[-1] == lines[-1]
+    assert kept[1:] == lines[-(len(kept) - 1):]
+    assert count_tokens(request) <= 300
+
+
+def test_single_oversized_line_is_cut_to_budget():
+    builder = make_builder()
+    messages = builder.build("Text: " + "z" * 20000, context=CONTEXT)
+    total = sum(count_tokens(m["content"]) for m in messages)
+    assert total <= builder.max_prompt_tokens
+    assert messages[1]["content"].startswith("Text: zzz")
+
+
+def test_truncate_tokens():
+    assert truncate_tokens("abcdefgh", 1) == "abcd"
+    assert truncate_tokens("short", 10) == "short"
+    assert truncate_tokens("anything", 0) == ""
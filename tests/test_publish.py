@@ -0,0 +1,98 @@
+# tests/test_publish.py
+import importlib.util
+import os
+
+import openpyxl
+import pandas as pd
+import pytest
+
+PUBLISH_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "tools", "1A_Charts_tools", "1a_charts_publish.py"
+)
+
+
+def make_df():
+    return pd.DataFrame(
+        {
+            "Date": pd.to_datetime(["2025-01-31", "2025-01-31", "2025-02-28", "2025-02-28", "2025-03-31"]),
+            "Metric_Name": [
+                "Total User Base Since Inception",
+                "Total Activated",
+                "Total User Base Since Inception",
+                "Total Activated",
+                "Total Activated",
+            ],
+            "Metric_Value": [1_000_000, 500_000, 1_100_000, 550_000, 600_000],
+        }
+    )
+
+
+@pytest.fixture
+def publish(monkeypatch):
+    # The module loads the S3 dataset at import time -> serve a local frame instead
+    monkeypatch.setattr(pd, "read_csv", lambda *args, **kwargs: make_df())
+    spec = importlib.util.spec_from_file_location("charts_publish", PUBLISH_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_repeat_publish_reuses_cached_build(publish, tmp_path, monkeypatch):
+    publisher = publish.OneAChartsPublisher("local.csv")
+    builds = []
+    original = publisher._build_dashboard
+    monkeypatch.setattr(publisher, "_build_dashboard", lambda *a: builds.append(a) or original(*a))
+
+    first = publisher.publish_dashboard("28/02/25", output_dir=str(tmp_path))
+    second = publisher.publish_dashboard("28/02/25", output_dir=str(tmp_path))
+
+    assert len(builds) == 1
+    assert first == second  # cache reuse is logged, not part of the reply
+    assert "cached" not in second
+
+
+def test_cache_key_includes_metrics_and_dataset_version(publish, tmp_path):
+    publisher = publish.OneAChartsPublisher("local.csv")
+    publisher.publish_dashboard("28/02/25", output_dir=str(tmp_path))
+    publisher.publish_dashboard("28/02/25", output_dir=str(tmp_path), metrics=["Total Activated"])
+    assert len(publisher._dashboard_cache) == 2
+
+    publisher.dataset_version = "changed"
+    publisher.publish_dashboard("28/02/25", output_dir=str(tmp_path))
+    assert len(publisher._dashboard_cache) == 3
+
+
+def test_dataset_version_follows_data(publish, monkeypatch):
+    a = publish.OneAChartsPublisher("local.csv")
+    assert publish.OneAChartsPublisher("local.csv").dataset_version == a.dataset_version
+
+    changed = make_df()
+    changed.loc[0, "Metric_Value"] = 1
+    monkeypatch.setattr(pd, "read_csv", lambda *args, **kwargs: changed)
+    assert publish.OneAChartsPublisher("local.csv").dataset_version != a.dataset_version
+
+
+def test_lru_eviction(publish, tmp_path):
+    publisher = publish.OneAChartsPublisher("local.csv", cache_size=2)
+    for date in ("31/01/25", "28/02/25"):
+        publisher.publish_dashboard(date, output_dir=str(tmp_path))
+    publisher.publish_dashboard("31/01/25", output_dir=str(tmp_path))  # January is now most recent
+    publisher.publish_dashboard("31/03/25", output_dir=str(tmp_path))
+
+    dates = [key[0].isoformat() for key in publisher._dashboard_cache]
+    assert dates == ["2025-01-31", "2025-03-31"]
+
+
+def test_batch_workbook_has_one_sheet_per_date(publish, tmp_path):
+    publisher = publish.OneAChartsPublisher("local.csv")
+    result = publisher.publish_dashboards(
+        ["31/03/25", "28/02/25", "28/02/25"], output_dir=str(tmp_path), upload_to_s3=False
+    )
+    assert result.startswith("✅ 2 dashboards")
+
+    workbook = openpyxl.load_workbook(tmp_path / "1A_Charts_Dashboards_2025-02-28_to_2025-03-31.xlsx")
+    assert workbook.sheetnames == ["2025-02-28", "2025-03-31"]
+
+    rows = list(workbook["2025-02-28"].iter_rows(values_only=True))
+    assert rows[0] == ("Particulars", "Feb, 2025", "Jan, 2025", "Change")
+    assert rows[2] == ("Total Activated", "0.55M", "0.50M", "10.00%")
@@ -0,0 +1,65 @@
+# tests/test_single_flight.py
+import asyncio
+import threading
+import time
+
+import pytest
+
+from utils.single_flight import AsyncSingleFlight, SingleFlight
+
+
+def test_key_is_released_after_the_leader_finishes():
+    flight = SingleFlight("test")
+    assert flight.do("k", lambda: 1) == (1, True)
+    assert flight.do("k", lambda: 2) == (2, True)  # not a cache
+    assert flight.stats()["inflight"] == 0
+
+
+def test_followers_get_the_leaders_exception():
+    flight = SingleFlight("test")
+    started = threading.Event()
+    errors = []
+
+    def fail():
+        started.set()
+        time.sleep(0.1)
+        raise ValueError("boom")
+
+    def follower():
+        started.wait()
+        try:
+            flight.do("k", lambda: "unused")
+        except ValueError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=follower)
+    thread.start()
+    with pytest.raises(ValueError):
+        flight.do("k", fail)
+    thread.join()
+
+    assert len(errors) == 1
+    stats = flight.stats()
+    assert (stats["calls"], stats["coalesced"]) == (2, 1)
+
+
+def test_cancelled_follower_does_not_cancel_shared_call():
+    flight = AsyncSingleFlight("test")
+    runs = []
+
+    async def work():
+        await asyncio.sleep(0.05)
+        runs.append(1)
+        return "done"
+
+    async def main():
+        leader = asyncio.ensure_future(flight.do("k", work))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("k", work))
+        await asyncio.sleep(0)
+        follower.cancel()
+        return await leader
+
+    assert asyncio.run(main()) == ("done", True)
+    assert runs == [1]
+    assert flight.stats()["inflight"] == 0
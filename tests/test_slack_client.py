@@ -0,0 +1,229 @@
+# tests/test_slack_client.py
+import asyncio
+import threading
+import time
+
+import pytest
+
+from fake_slack import FakeSlack
+from utils import slack_client
+from utils.slack_client import AsyncSlackClient, SlackAPIError, SlackClient, TokenBucket
+
+
+@pytest.fixture
+def slack():
+    fake = FakeSlack().start()
+    yield fake
+    fake.stop()
+
+
+@pytest.fixture
+def client(slack):
+    return SlackClient("xoxb-test", base_url=slack.url)
+
+
+def test_token_bucket_allows_burst_then_waits():
+    bucket = TokenBucket(rate_per_sec=20, capacity=2)
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == pytest.approx(0.05, abs=0.03)
+
+
+def test_token_bucket_pause_holds_calls_for_retry_after():
+    bucket = TokenBucket(rate_per_sec=10, capacity=5)
+    bucket.pause(0.2)
+    start = time.monotonic()
+    bucket.acquire()
+    assert time.monotonic() - start == pytest.approx(0.2, abs=0.05)
+
+
+def test_token_bucket_async_acquire_shares_tokens_with_sync():
+    bucket = TokenBucket(rate_per_sec=20, capacity=1)
+    assert bucket.acquire() == 0
+    assert asyncio.run(bucket.acquire_async()) == pytest.approx(0.05, abs=0.03)
+    assert bucket.try_acquire() > 0
+
+
+def test_post_message_bucket_is_per_channel(client):
+    assert client._bucket("chat.postMessage", "C1") is client._bucket("chat.postMessage", "C1")
+    assert client._bucket("chat.postMessage", "C1") is not client._bucket("chat.postMessage", "C2")
+    assert client._bucket("files.info", "C1") is client._bucket("files.info", "C2")
+
+
+def test_retry_after_is_honoured(slack, client):
+    slack.respond("conversations.replies", status=429, headers={"Retry-After": "0.3"})
+    start = time.monotonic()
+    body = client.conversations_replies(channel="C1", ts="1.0")
+
+    assert body["ok"]
+    assert time.monotonic() - start >= 0.25
+    assert len(slack.calls) == 2
+    assert client.stats()["conversations.replies"]["rate_limited"] == 1
+
+
+def test_final_429_raises_slack_api_error(slack):
+    client = SlackClient("xoxb-test", base_url=slack.url, max_retries=1)
+    for _ in range(2):
+        slack.respond("files.info", status=429, headers={"Retry-After": "0.1"})
+
+    with pytest.raises(SlackAPIError) as error:
+        client.files_info(file="F1")
+    assert error.value.response["error"] == "ratelimited"
+    assert client.stats()["files.info"]["rate_limited"] == 2
+
+
+def test_ok_false_raises_slack_api_error(slack, client):
+    slack.respond("files.info", body={"ok": False, "error": "file_not_found"})
+    with pytest.raises(SlackAPIError, match="file_not_found"):
+        client.files_info(file="F1")
+
+
+def test_merge_posts_immediately_when_thread_is_idle(slack, client):
+    start = time.monotonic()
+    client.chat_postMessage(channel="C1", thread_ts="1.0", text="hello", merge=True)
+    assert time.monotonic() - start < 0.2
+    assert slack.posted_texts() == ["hello"]
+
+
+def test_merge_combines_posts_behind_in_flight_one_and_drops_duplicates(slack, client):
+    slack.delays["chat.postMessage"] = 0.3
+    responses = {}
+
+    def post(text, name):
+        responses[name] = client.chat_postMessage(channel="C1", thread_ts="1.0", text=text, merge=True)
+
+    first = threading.Thread(target=post, args=("first", "a"))
+    first.start()
+    time.sleep(0.1)  # "first" is now in flight
+    others = [
+        threading.Thread(target=post, args=(text, name))
+        for text, name in (("second", "b"), ("third", "c"), ("first", "d"), ("second", "e"))
+    ]
+    for thread in others:
+        thread.start()
+        time.sleep(0.02)
+    for thread in [first] + others:
+        thread.join()
+
+    assert slack.posted_texts() == ["first", "second\n\nthird"]
+    assert responses["d"] is responses["a"]
+    assert responses["b"] is responses["c"] is responses["e"]
+    stats = client.stats()["chat.postMessage"]
+    assert stats["merged"] == 1
+    assert stats["deduplicated"] == 2
+
+
+def test_merge_keeps_threads_separate(slack, client):
+    slack.delays["chat.postMessage"] = 0.2
+    threads = [
+        threading.Thread(target=client.chat_postMessage,
+                         kwargs={"channel": "C1", "thread_ts": ts, "text": "hi", "merge": True})
+        for ts in ("1.0", "2.0")
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(params["thread_ts"] for _, params in slack.calls) == ["1.0", "2.0"]
+
+
+def test_async_client_shares_buckets_and_merging(slack, client):
+    slack.delays["chat.postMessage"] = 0.3
+    aclient = AsyncSlackClient(client)
+
+    async def post(text, delay):
+        await asyncio.sleep(delay)
+        return await aclient.chat_postMessage(channel="C1", thread_ts="1.0", text=text, merge=True)
+
+    async def main():
+        try:
+            return await asyncio.gather(post("first", 0), post("second", 0.1), post("first", 0.15))
+        finally:
+            await aclient.close()
+
+    first, second, duplicate = asyncio.run(main())
+    assert slack.posted_texts() == ["first", "second"]
+    assert duplicate is first
+    assert aclient.stats() == client.stats()
+
+
+def test_async_client_does_not_block_the_event_loop(slack, client):
+    slack.delays["conversations.replies"] = 0.3
+    aclient = AsyncSlackClient(client)
+    ticks = []
+
+    async def ticker():
+        while len(ticks) < 5:
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.02)
+
+    async def main():
+        await asyncio.gather(aclient.conversations_replies(channel="C1", ts="1.0"), ticker())
+        await aclient.close()
+
+    asyncio.run(main())
+    assert len(ticks) == 5
+    assert ticks[-1] - ticks[0] < 0.25  # ticked while the call was in flight
+
+
+def test_throttled_async_posts_do_not_delay_unrelated_calls(slack, client):
+    aclient = AsyncSlackClient(client)
+
+    async def main():
+        # 40 posts to one channel: ~37s of throttling at 1 post/s
+        posts = [
+            asyncio.ensure_future(aclient.chat_postMessage(channel="C1", text=f"post {i}"))
+            for i in range(40)
+        ]
+        await asyncio.sleep(0.1)
+        start = time.monotonic()
+        await aclient.conversations_replies(channel="C2", ts="1.0")
+        latency = time.monotonic() - start
+        for post in posts:
+            post.cancel()
+        await asyncio.gather(*posts, return_exceptions=True)
+        await aclient.close()
+        return latency
+
+    assert asyncio.run(main()) < 0.5
+    assert client.stats()["chat.postMessage"]["calls"] == 3  # the burst, the rest were waiting
+
+
+def test_async_client_honours_retry_after_without_threads(slack, client):
+    slack.respond("files.info", status=429, headers={"Retry-After": "0.3"})
+    aclient = AsyncSlackClient(client)
+
+    async def main():
+        start = time.monotonic()
+        body = await aclient.files_info(file="F1")
+        await aclient.close()
+        return body, time.monotonic() - start
+
+    body, elapsed = asyncio.run(main())
+    assert body["ok"]
+    assert elapsed >= 0.25
+    assert len(slack.calls) == 2
+    assert client.stats()["files.info"]["rate_limited"] == 1
+
+
+def test_rate_share_splits_budgets_between_processes(slack):
+    client = SlackClient("xoxb-test", base_url=slack.url, rate_share=0.25)
+    replies = client._bucket("conversations.replies")
+    assert replies.rate == pytest.approx(50 / 60 / 4)
+    assert client._bucket("chat.postMessage", "C1").rate == pytest.approx(0.25)
+
+
+def test_get_slack_client_takes_share_from_env(monkeypatch):
+    monkeypatch.setenv("SLACK_PROCESSES", "5")
+    monkeypatch.setattr(slack_client, "_clients", {})
+    monkeypatch.setattr(slack_client, "STATS_LOG_INTERVAL", 0)
+    assert slack_client.get_slack_client("xoxb-share").rate_share == pytest.approx(0.2)
+
+
+def test_log_slack_stats_reports_counters(slack, monkeypatch, capsys):
+    client = SlackClient("xoxb-test", base_url=slack.url)
+    monkeypatch.setattr(slack_client, "_clients", {"xoxb-test": client})
+    client.files_info(file="F1")
+    slack_client.log_slack_stats()
+    assert "Slack files.info" in capsys.readouterr().out
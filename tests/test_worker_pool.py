@@ -0,0 +1,144 @@
+# tests/test_worker_pool.py
+import os
+import threading
+import time
+from collections import Counter
+
+from graph.coalesce import coalesced
+from utils.worker_pool import WorkerPool
+
+
+def _run_fake(state):
+    if state["text"] == "crash":
+        os._exit(1)
+    if state["text"] == "hang":
+        time.sleep(60)
+    return {"response": state["text"].upper()}
+
+
+def init_fake_worker():
+    return _run_fake
+
+
+_executions = []
+
+
+def _slow_lookup(state):
+    _executions.append(state["thread_ts"])
+    run = len(_executions)
+    time.sleep(0.5)
+    state["result"] = f"pid {os.getpid()} run {run}"
+    return state
+
+
+def init_coalescing_worker():
+    return coalesced("lookup", _slow_lookup)
+
+
+class Replies:
+    def __init__(self):
+        self.values = []
+        self.event = threading.Event()
+
+    def __call__(self, final_state):
+        self.values.append(final_state.get("response"))
+        self.event.set()
+
+    def wait(self, timeout=20):
+        assert self.event.wait(timeout), "no reply received"
+        self.event.clear()
+        return self.values[-1]
+
+
+def make_pool(**kwargs):
+    options = dict(num_workers=1, heartbeat_interval=0.2, init_worker=init_fake_worker)
+    options.update(kwargs)
+    pool = WorkerPool(**options)
+    pool.start()
+    return pool
+
+
+def test_job_result_reaches_callback():
+    pool = make_pool()
+    try:
+        replies = Replies()
+        pool.submit({"text": "hello"}, replies)
+        assert replies.wait() == "HELLO"
+    finally:
+        pool.drain(timeout=5)
+
+
+def test_crashed_worker_is_restarted_and_caller_notified():
+    pool = make_pool()
+    try:
+        replies = Replies()
+        pool.submit({"text": "crash"}, replies)
+        assert "crashed" in replies.wait()
+
+        pool.submit({"text": "after"}, replies)
+        assert replies.wait() == "AFTER"
+        assert pool.health()["workers"][0]["restarts"] == 1
+    finally:
+        pool.drain(timeout=5)
+
+
+def test_hung_job_is_terminated_after_job_timeout():
+    # Heartbeats keep flowing from the hung worker, only the job timeout catches it
+    pool = make_pool(job_timeout=1.0)
+    try:
+        replies = Replies()
+        pool.submit({"text": "hang"}, replies)
+        assert "timed out" in replies.wait()
+
+        pool.submit({"text": "next"}, replies)
+        assert replies.wait() == "NEXT"
+    finally:
+        pool.drain(timeout=5)
+
+
+def test_drain_finishes_queued_jobs():
+    pool = make_pool()
+    replies = Replies()
+    for text in ("a", "b", "c"):
+        pool.submit({"text": text}, replies)
+    pool.drain(timeout=20)
+    assert sorted(replies.values) == ["A", "B", "C"]
+
+
+def test_slow_callback_does_not_block_other_results():
+    pool = make_pool()
+    try:
+        release = threading.Event()
+        replies = Replies()
+        pool.submit({"text": "slow"}, lambda final_state: release.wait(10))
+        pool.submit({"text": "fast"}, replies)
+
+        # The first reply is still "posting" while the second result is collected
+        assert replies.wait(timeout=5) == "FAST"
+        assert not release.is_set()
+        release.set()
+    finally:
+        pool.drain(timeout=5)
+
+
+def test_duplicates_with_same_route_key_coalesce_in_one_worker():
+    pool = make_pool(num_workers=2, init_worker=init_coalescing_worker)
+    try:
+        results = []
+        done = threading.Event()
+
+        def callback(final_state):
+            results.append(final_state["result"])
+            if len(results) == 4:
+                done.set()
+
+        state = {"channel_id": "C1", "text": "publish today's dashboard"}
+        for ts in ("1", "2", "3"):
+            pool.submit({**state, "thread_ts": ts}, callback, route_key=("C1", "publish"))
+        pool.submit({**state, "text": "other", "thread_ts": "4"}, callback, route_key=("C1", "other"))
+
+        assert done.wait(10)
+        # Every requester got a reply; the three duplicates share one execution
+        assert sorted(Counter(results).values()) == [1, 3]
+    finally:
+        pool.drain(timeout=5)
@@ -1,4 +1,5 @@
 #1a_charts_datewise_plot.py
+import hashlib
 import os
 import pandas as pd
 import matplotlib.pyplot as plt
@@ -23,6 +24,11 @@ class OneAChartsLookup:
         # Store original path for S3 uploads
         self.csv_path = csv_path
 
+        # Changes whenever the loaded data changes
+        self.dataset_version = hashlib.sha1(
+            pd.util.hash_pandas_object(self.df, index=False).values.tobytes()
+        ).hexdigest()[:12]
+
     def get_metric(self, metric_name: str, dates: List[str]) -> Dict[str, Union[int, None, str]]:
         """
         Retrieve Metric_Value(s) for given Metric_Name and date(s).
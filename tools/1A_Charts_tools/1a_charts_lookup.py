@@ -9,6 +9,10 @@ CSV_PATH = "s3://aws-logs-620144979924-ap-south-1/analytics-slack-agent/data/1A_
 # Initialize once
 lookup_tool = OneAChartsLookup(CSV_PATH)
 
+def dataset_version() -> str:
+    """Version of the loaded 1A_Charts data (used for request coalescing)."""
+    return lookup_tool.dataset_version
+
 def lookup_node(state: Dict) -> Dict:
     """
     LangGraph node: perform a lookup in 1A_Charts.
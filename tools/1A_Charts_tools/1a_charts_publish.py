@@ -1,18 +1,27 @@
 # tools/1A_Charts/1a_charts_publish.py
 
+import hashlib
+import io
 import os
-import pandas as pd
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
 import boto3
-from typing import Dict
+import pandas as pd
+import xlsxwriter
+
+DEFAULT_METRICS = ("Total User Base Since Inception", "Total Activated")
 
 class OneAChartsPublisher:
-    def __init__(self, csv_path: str):
+    def __init__(self, csv_path: str, cache_size: int = 32):
         """
         Initialize publisher for 1A_Charts.
 
         Args:
             csv_path: Path to the 1A_Charts CSV file
                       (local path OR s3://bucket/key.csv)
+            cache_size: number of built dashboards kept in memory
         """
         storage_opts = {"anon": False} if csv_path.startswith("s3://") else None
         self.df = pd.read_csv(
@@ -26,47 +35,45 @@ class OneAChartsPublisher:
         # Store for re-use (for S3 writes later)
         self.csv_path = csv_path
 
-    def publish_dashboard(
-        self,
-        target_date: str,
-        output_dir: str = "./",
-        upload_to_s3: bool = True,
-    ):
-        """
-        Generate dashboard summary for a given date and export to Excel.
+        # Month/year per row, computed once instead of per publish
+        dates = pd.to_datetime(self.df["Date"])
+        self._year = dates.dt.year
+        self._month = dates.dt.month
 
-        Args:
-            target_date: date string in dd/mm/yy format
-            output_dir: folder where Excel will be saved (temp if S3 used)
-            upload_to_s3: if True and csv_path was S3, uploads result back to S3
+        # Changes whenever the loaded data changes -> part of the cache key
+        self.dataset_version = hashlib.sha1(
+            pd.util.hash_pandas_object(self.df, index=False).values.tobytes()
+        ).hexdigest()[:12]
 
-        Returns:
-            str: local file path (and S3 URI if uploaded)
-        """
-        # Parse target date
-        date_obj = pd.to_datetime(target_date, format="%d/%m/%y").date()
+        # (target_date, metrics, dataset_version) -> {"bytes", "s3_uri"}
+        self._dashboard_cache: "OrderedDict[tuple, Dict]" = OrderedDict()
+        self.cache_size = cache_size
+        self._cache_lock = threading.Lock()
 
+    def _build_dashboard(self, date_obj, metrics) -> Tuple[List[str], List[List[str]]]:
+        """Return (columns, rows) of the dashboard table for a date."""
         # Current + previous month
         curr_month, year = date_obj.month, date_obj.year
         prev_month = curr_month - 1 if curr_month > 1 else 12
         prev_year = year if prev_month != 12 else year - 1
 
         # Filter
-        curr_df = self.df[
-            (self.df["Date"].apply(lambda d: d.month) == curr_month)
-            & (self.df["Date"].apply(lambda d: d.year) == year)
-        ]
-        prev_df = self.df[
-            (self.df["Date"].apply(lambda d: d.month) == prev_month)
-            & (self.df["Date"].apply(lambda d: d.year) == prev_year)
-        ]
+        curr_df = self.df[(self._month == curr_month) & (self._year == year)]
+        prev_df = self.df[(self._month == prev_month) & (self._year == prev_year)]
 
         # Last available values
         curr_vals = curr_df.groupby("Metric_Name")["Metric_Value"].last()
         prev_vals = prev_df.groupby("Metric_Name")["Metric_Value"].last()
 
+        columns = [
+            "Particulars",
+            date_obj.strftime("%b, %Y"),
+            pd.to_datetime(f"{prev_month}/{prev_year}", format="%m/%Y").strftime("%b, %Y"),
+            "Change",
+        ]
+
         rows = []
-        for metric in ["Total User Base Since Inception", "Total Activated"]:
+        for metric in metrics:
             curr_val = curr_vals.get(metric, None)
             prev_val = prev_vals.get(metric, None)
 
@@ -75,19 +82,98 @@ class OneAChartsPublisher:
                 change = ((curr_val - prev_val) / prev_val) * 100
 
             rows.append(
-                {
-                    "Particulars": metric,
-                    f"{date_obj.strftime('%b, %Y')}": f"{curr_val/1e6:.2f}M"
-                    if curr_val
-                    else "N/A",
-                    f"{pd.to_datetime(f'{prev_month}/{prev_year}', format='%m/%Y').strftime('%b, %Y')}": f"{prev_val/1e6:.2f}M"
-                    if prev_val
-                    else "N/A",
-                    "Change": f"{change:.2f}%" if change is not None else "N/A",
-                }
+                [
+                    metric,
+                    f"{curr_val/1e6:.2f}M" if curr_val else "N/A",
+                    f"{prev_val/1e6:.2f}M" if prev_val else "N/A",
+                    f"{change:.2f}%" if change is not None else "N/A",
+                ]
             )
 
-        dashboard_df = pd.DataFrame(rows)
+        return columns, rows
+
+    @staticmethod
+    def _write_sheet(workbook, sheet_name: str, columns: List[str], rows: List[List[str]]):
+        """
+        Write one dashboard table to a new worksheet, strictly row by row
+        so it also works with xlsxwriter's constant_memory mode.
+        """
+        worksheet = workbook.add_worksheet(sheet_name)
+        header_fmt = workbook.add_format(
+            {"bold": True, "bg_color": "#DCE6F1", "align": "center"}
+        )
+
+        # Column widths from the (already string) cells
+        for i, col in enumerate(columns):
+            col_width = max([len(col)] + [len(row[i]) for row in rows]) + 2
+            worksheet.set_column(i, i, col_width)
+
+        worksheet.write_row(0, 0, columns, header_fmt)
+        for r, row in enumerate(rows, start=1):
+            worksheet.write_row(r, 0, row)
+
+    def _cache_get(self, key) -> Optional[Dict]:
+        with self._cache_lock:
+            entry = self._dashboard_cache.get(key)
+            if entry is not None:
+                self._dashboard_cache.move_to_end(key)
+            return entry
+
+    def _cache_put(self, key, entry: Dict):
+        with self._cache_lock:
+            self._dashboard_cache[key] = entry
+            self._dashboard_cache.move_to_end(key)
+            while len(self._dashboard_cache) > self.cache_size:
+                self._dashboard_cache.popitem(last=False)
+
+    def _upload(self, local_file: str) -> str:
+        """Upload next to the source CSV under output/1A_Charts; returns the S3 URI."""
+        bucket = self.csv_path.split("/")[2]
+        prefix = "/".join(self.csv_path.split("/")[3:-1])
+        s3_key = f"{prefix}/output/1A_Charts/{os.path.basename(local_file)}"
+
+        s3 = boto3.client("s3")
+        s3.upload_file(local_file, bucket, s3_key)
+
+        return f"s3://{bucket}/{s3_key}"
+
+    def publish_dashboard(
+        self,
+        target_date: str,
+        output_dir: str = "./",
+        upload_to_s3: bool = True,
+        metrics: Optional[List[str]] = None,
+    ):
+        """
+        Generate dashboard summary for a given date and export to Excel.
+        Built workbooks are cached per (target_date, metrics, dataset_version),
+        so repeat publishes on unchanged data reuse the existing bytes.
+
+        Args:
+            target_date: date string in dd/mm/yy format
+            output_dir: folder where Excel will be saved (temp if S3 used)
+            upload_to_s3: if True and csv_path was S3, uploads result back to S3
+            metrics: metric names to include (defaults to DEFAULT_METRICS)
+
+        Returns:
+            str: local file path (and S3 URI if uploaded)
+        """
+        # Parse target date
+        date_obj = pd.to_datetime(target_date, format="%d/%m/%y").date()
+        metrics = tuple(metrics or DEFAULT_METRICS)
+
+        # Reuse the workbook built earlier for the same date/metrics/data
+        key = (date_obj, metrics, self.dataset_version)
+        entry = self._cache_get(key)
+        cached = entry is not None
+        if not cached:
+            columns, rows = self._build_dashboard(date_obj, metrics)
+            buffer = io.BytesIO()
+            workbook = xlsxwriter.Workbook(buffer, {"in_memory": True})
+            self._write_sheet(workbook, "Dashboard", columns, rows)
+            workbook.close()
+            entry = {"bytes": buffer.getvalue(), "s3_uri": None}
+            self._cache_put(key, entry)
 
         # Ensure local output dir exists
         os.makedirs(output_dir, exist_ok=True)
@@ -95,38 +181,67 @@ class OneAChartsPublisher:
             output_dir, f"1A_Charts_Dashboard_{date_obj}.xlsx"
         )
 
-        # Save to Excel
-        with pd.ExcelWriter(local_file, engine="xlsxwriter") as writer:
-            dashboard_df.to_excel(writer, index=False, sheet_name="Dashboard")
-
-            # Formatting
-            workbook = writer.book
-            worksheet = writer.sheets["Dashboard"]
-
-            header_fmt = workbook.add_format(
-                {"bold": True, "bg_color": "#DCE6F1", "align": "center"}
-            )
-            for col_num, value in enumerate(dashboard_df.columns.values):
-                worksheet.write(0, col_num, value, header_fmt)
-
-            for i, col in enumerate(dashboard_df.columns):
-                col_width = (
-                    max(dashboard_df[col].astype(str).map(len).max(), len(col)) + 2
-                )
-                worksheet.set_column(i, i, col_width)
+        # Save to Excel (skip the write if an identical file is already there)
+        if not cached or not os.path.exists(local_file) or os.path.getsize(local_file) != len(entry["bytes"]):
+            with open(local_file, "wb") as f:
+                f.write(entry["bytes"])
 
+        if cached:
+            print(f"♻️ Reused cached 1A_Charts dashboard build for {date_obj}")
         result = f"✅ Dashboard exported locally: {local_file}"
 
         # Upload to S3 if requested
         if upload_to_s3 and self.csv_path.startswith("s3://"):
-            bucket = self.csv_path.split("/")[2]
-            prefix = "/".join(self.csv_path.split("/")[3:-1])
-            s3_key = f"{prefix}/output/1A_Charts/{os.path.basename(local_file)}"
+            # Same bytes already uploaded under the same key -> skip re-upload
+            s3_uri = entry["s3_uri"] or self._upload(local_file)
+            entry["s3_uri"] = s3_uri
+            result += f"\n☁️ Also uploaded to: {s3_uri}"
 
-            s3 = boto3.client("s3")
-            s3.upload_file(local_file, bucket, s3_key)
+        return result
 
-            s3_uri = f"s3://{bucket}/{s3_key}"
+    def publish_dashboards(
+        self,
+        target_dates: List[str],
+        output_dir: str = "./",
+        upload_to_s3: bool = True,
+        metrics: Optional[List[str]] = None,
+    ):
+        """
+        Batch mode: write dashboards for many dates into one workbook,
+        one sheet per date, using xlsxwriter's constant_memory mode.
+
+        Args:
+            target_dates: date strings in dd/mm/yy format
+            output_dir: folder where Excel will be saved (temp if S3 used)
+            upload_to_s3: if True and csv_path was S3, uploads result back to S3
+            metrics: metric names to include (defaults to DEFAULT_METRICS)
+
+        Returns:
+            str: local file path (and S3 URI if uploaded)
+        """
+        date_objs = sorted(
+            {pd.to_datetime(d, format="%d/%m/%y").date() for d in target_dates}
+        )
+        if not date_objs:
+            raise ValueError("No target dates given for batch publish")
+        metrics = tuple(metrics or DEFAULT_METRICS)
+
+        os.makedirs(output_dir, exist_ok=True)
+        local_file = os.path.join(
+            output_dir,
+            f"1A_Charts_Dashboards_{date_objs[0]}_to_{date_objs[-1]}.xlsx",
+        )
+
+        workbook = xlsxwriter.Workbook(local_file, {"constant_memory": True})
+        for date_obj in date_objs:
+            columns, rows = self._build_dashboard(date_obj, metrics)
+            self._write_sheet(workbook, date_obj.isoformat(), columns, rows)
+        workbook.close()
+
+        result = f"✅ {len(date_objs)} dashboards exported locally: {local_file}"
+
+        if upload_to_s3 and self.csv_path.startswith("s3://"):
+            s3_uri = self._upload(local_file)
             result += f"\n☁️ Also uploaded to: {s3_uri}"
 
         return result
@@ -136,18 +251,27 @@ class OneAChartsPublisher:
 CSV_PATH = "s3://aws-logs-620144979924-ap-south-1/analytics-slack-agent/data/1A_Charts/1A_Charts_2025.csv"
 _publisher = OneAChartsPublisher(CSV_PATH)
 
+def dataset_version() -> str:
+    """Version of the loaded 1A_Charts data (used for request coalescing)."""
+    return _publisher.dataset_version
+
 def publish_node(state: Dict) -> Dict:
     """
     LangGraph node for publishing 1A_Charts dashboards.
-    Expects: state["target_date"] in dd/mm/yy format
+    Expects: state["target_date"] in dd/mm/yy format,
+             or state["target_dates"] (list) for a batch workbook
     """
     target_date = state.get("target_date")
-    if not target_date:
+    target_dates = state.get("target_dates")
+    if not target_date and not target_dates:
         state["result"] = "⚠️ Missing target_date for publish."
         return state
 
     try:
-        result = _publisher.publish_dashboard(target_date)
+        if target_dates:
+            result = _publisher.publish_dashboards(target_dates)
+        else:
+            result = _publisher.publish_dashboard(target_date)
         state["result"] = result
     except Exception as e:
         state["result"] = f"⚠️ Publish failed: {e}"
@@ -0,0 +1,76 @@
+# tools/summarize_file.py
+import json
+from typing import Dict
+from openai import OpenAI
+from utils.secrets_loader import load_secrets
+from utils.prompt_builder import PromptBuilder
+from utils.file_cache import SlackFileCache
+from utils.file_profile import profile_file
+
+# Ensure OpenAI key is loaded from AWS Secrets Manager
+try:
+    secrets = load_secrets()
+except Exception as e:
+    raise RuntimeError(f"Failed to load secrets for OpenAI: {e}")
+
+client = OpenAI(api_key=secrets.get("OPENAI_API_KEY"))
+file_cache = SlackFileCache()
+
+prompt_builder = PromptBuilder(
+    node="summarize_file",
+    instructions="""
+You are a helpful assistant. You are given a JSON profile of a file shared in Slack
+(its columns, statistics and sample rows, or a text preview).
+Summarize what the file contains and point out notable values or data quality issues.
+""",
+    max_prompt_tokens=6000,
+)
+
+def summarize_file_node(state: Dict) -> Dict:
+    """
+    LangGraph node: profile a shared Slack file and summarize it with GPT-4o.
+    The parsed profile and the summary are stored as artifacts of the file's
+    content hash, so identical content is never parsed or summarized twice.
+
+    Expects state to include:
+        - file_id, file_metadata: the shared Slack file
+        - slack_client: utils.slack_client.SlackClient (token + session for the download)
+        - file_sha256 (optional): content hash, when the listener already hashed it
+
+    Updates:
+        - state["file_sha256"]: content hash
+        - state["result"]: summary text
+    """
+    file_id = state.get("file_id")
+    file_meta = state.get("file_metadata")
+    slack_client = state.get("slack_client")
+
+    if not file_id or not file_meta or not slack_client:
+        state["result"] = "⚠️ Missing Slack file context (file_id/file_metadata/slack_client)."
+        return state
+
+    # 1. Bytes from the cache (downloaded only the first time this content is seen)
+    sha256, data = file_cache.fetch_bytes(
+        file_id, file_meta, slack_client.token, session=getattr(slack_client, "session", None)
+    )
+    state["file_sha256"] = sha256
+
+    summary = file_cache.get_artifact(sha256, "summary")
+    if summary is None:
+        # 2. Parsed profile, shared by every summary of this content
+        profile = file_cache.get_artifact(sha256, "profile")
+        if profile is None:
+            profile = profile_file(data, file_meta)
+            file_cache.put_artifact(sha256, "profile", profile)
+
+        # 3. Ask GPT-4o for a summary of the profile
+        response = client.chat.completions.create(
+            model="gpt-4o",
+            messages=prompt_builder.build(json.dumps(profile, default=str, indent=1))
+        )
+        prompt_builder.record_usage(response)
+        summary = response.choices[0].message.content.strip()
+        file_cache.put_artifact(sha256, "summary", summary)
+
+    state["result"] = f"📎 *File Summary ({file_meta.get('name')}):*\n{summary}"
+    return state
@@ -1,7 +1,8 @@
 # tools/summarize_thread.py
 from typing import Dict
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 from utils.secrets_loader import load_secrets
+from utils.prompt_builder import PromptBuilder
 import os
 
 # Ensure OpenAI key is loaded from AWS Secrets Manager
@@ -11,6 +12,37 @@ except Exception as e:
     raise RuntimeError(f"Failed to load secrets for OpenAI: {e}")
 
 client = OpenAI(api_key=secrets.get("OPENAI_API_KEY"))
+async_client = AsyncOpenAI(api_key=secrets.get("OPENAI_API_KEY"))
+
+prompt_builder = PromptBuilder(
+    node="summarize_thread",
+    instructions="""
+You are a helpful assistant. Summarize the following Slack thread clearly and concisely.
+Highlight main points, decisions, and action items if any.
+""",
+    max_prompt_tokens=12000,
+)
+
+MISSING_CONTEXT = "⚠️ Missing Slack context (channel_id/thread_ts/slack_client)."
+NO_MESSAGES = "⚠️ No messages found in this thread to summarize."
+
+def _slack_context(state: Dict):
+    """(channel_id, thread_ts, slack_client), or None if any is missing."""
+    context = (state.get("channel_id"), state.get("thread_ts"), state.get("slack_client"))
+    return context if all(context) else None
+
+def _summary_prompt(replies: Dict):
+    """Chat messages asking for a summary of the thread, or None if it has no text."""
+    messages = [m.get("text", "") for m in replies.get("messages", []) if "text" in m]
+    if not messages:
+        return None
+    # Oldest messages are dropped if over budget
+    return prompt_builder.build("\n".join([f"- {m}" for m in messages]))
+
+def _summary_text(response) -> str:
+    """Reply text for the summary; the listener posts it to every requester's thread."""
+    prompt_builder.record_usage(response)
+    return f"📄 *Thread Summary:*\n{response.choices[0].message.content.strip()}"
 
 def summarize_thread_node(state: Dict) -> Dict:
     """
@@ -20,57 +52,61 @@ def summarize_thread_node(state: Dict) -> Dict:
         - channel_id: Slack channel ID
         - thread_ts: parent thread timestamp
         - slack_client: Slack WebClient (from slack_bolt.App.client)
+        - prefetch (optional): utils.prefetch.Prefetch with "thread_replies"
 
     Updates:
-        - state["result"]: summary text
+        - state["result"]: summary reply (posted by the listener, so coalesced
+          duplicates each get it in their own thread)
     """
-    channel_id = state.get("channel_id")
-    thread_ts = state.get("thread_ts")
-    slack_client = state.get("slack_client")
-
-    if not channel_id or not thread_ts or not slack_client:
-        state["result"] = "⚠️ Missing Slack context (channel_id/thread_ts/slack_client)."
+    context = _slack_context(state)
+    if context is None:
+        state["result"] = MISSING_CONTEXT
         return state
+    channel_id, thread_ts, slack_client = context
 
-    # 1. Get all messages in the thread
-    replies = slack_client.conversations_replies(
-        channel=channel_id,
-        ts=thread_ts
-    )
-
-    messages = [m.get("text", "") for m in replies.get("messages", []) if "text" in m]
+    # 1. Get all messages in the thread (prefetched during classification if possible)
+    prefetch = state.get("prefetch")
+    replies = prefetch.get("thread_replies") if prefetch else None
+    if replies is None:
+        replies = slack_client.conversations_replies(channel=channel_id, ts=thread_ts)
 
-    if not messages:
-        summary = "⚠️ No messages found in this thread to summarize."
-        slack_client.chat_postMessage(channel=channel_id, thread_ts=thread_ts, text=summary)
-        state["result"] = summary
+    messages = _summary_prompt(replies)
+    if messages is None:
+        state["result"] = NO_MESSAGES
         return state
 
     # 2. Ask GPT-4o for a summary
-    system_prompt = """
-    You are a helpful assistant. Summarize the following Slack thread clearly and concisely.
-    Highlight main points, decisions, and action items if any.
-    """
+    response = client.chat.completions.create(model="gpt-4o", messages=messages)
 
-    user_content = "\n".join([f"- {m}" for m in messages])
+    # 3. Update state
+    state["result"] = _summary_text(response)
+    return state
 
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_content}
-        ]
-    )
 
-    summary = response.choices[0].message.content.strip()
+async def asummarize_thread_node(state: Dict) -> Dict:
+    """
+    Async variant of summarize_thread_node for the async graph: same steps,
+    with the Slack and OpenAI calls awaited.
 
-    # 3. Post back into Slack thread
-    slack_client.chat_postMessage(
-        channel=channel_id,
-        thread_ts=thread_ts,
-        text=f"📄 *Thread Summary:*\n{summary}"
-    )
+    Expects state["slack_client"] to be a utils.slack_client.AsyncSlackClient
+    and state["prefetch"] (optional) to be a utils.prefetch.AsyncPrefetch.
+    """
+    context = _slack_context(state)
+    if context is None:
+        state["result"] = MISSING_CONTEXT
+        return state
+    channel_id, thread_ts, slack_client = context
+
+    prefetch = state.get("prefetch")
+    replies = await prefetch.get("thread_replies") if prefetch else None
+    if replies is None:
+        replies = await slack_client.conversations_replies(channel=channel_id, ts=thread_ts)
+
+    messages = _summary_prompt(replies)
+    if messages is None:
+        state["result"] = NO_MESSAGES
+        return state
 
-    # 4. Update state
-    state["result"] = summary
+    response = await async_client.chat.completions.create(model="gpt-4o", messages=messages)
+    state["result"] = _summary_text(response)
     return state
@@ -0,0 +1,18 @@
+# utils/context_loader.py
+import os
+from functools import lru_cache
+
+CONTEXT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "channel_context")
+
+
+@lru_cache(maxsize=128)
+def load_channel_context(channel_id: str) -> str:
+    """
+    Load the markdown context for a Slack channel (channel_context/<id>.md).
+    Returns "" when the channel has no context file. Cached per process.
+    """
+    path = os.path.join(CONTEXT_DIR, f"{channel_id}.md")
+    if not os.path.exists(path):
+        return ""
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read().strip()
@@ -0,0 +1,248 @@
+# utils/file_cache.py
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import requests
+from typing import Any, Dict, Optional, Tuple
+
+DEFAULT_CACHE_DIR = os.environ.get("FILE_CACHE_DIR", "/tmp/dobby_file_cache")
+DEFAULT_MAX_BYTES = int(os.environ.get("FILE_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+# files_info metadata (channels, shares, ...) goes stale; content blobs don't
+DEFAULT_META_TTL = float(os.environ.get("FILE_CACHE_META_TTL", 24 * 60 * 60))
+
+# Workflow outputs kept per content hash, so identical files replay them
+RESULT_KEYS = ("intent", "result", "response")
+# Intents whose output is worth replaying (anything else produced no answer)
+UNANSWERED_INTENTS = (None, "unknown")
+
+
+def _atomic_write(path: str, data: bytes):
+    """Write bytes via a temp file + rename so readers never see partial files."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class SlackFileCache:
+    """
+    Local disk cache for Slack files, keyed by file id and content hash.
+
+    Layout:
+        <root>/meta/<file_id>.json          -> {"metadata": {...}, "sha256": "..."}
+        <root>/blobs/<sha256>/raw           -> raw file bytes
+        <root>/blobs/<sha256>/<artifact>    -> derived artifacts (profiles, summaries, ...)
+
+    Metadata is indexed by Slack file id, so re-shares of the same file skip
+    `files_info`; entries expire after `meta_ttl` seconds. Bytes and derived
+    artifacts are indexed by content hash, so identical content uploaded as
+    a new file reuses earlier parsing/LLM work. Blob directories are evicted
+    least-recently-used once the total size exceeds `max_bytes`.
+    """
+
+    def __init__(self, root: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES,
+                 meta_ttl: float = DEFAULT_META_TTL):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.meta_ttl = meta_ttl
+        self._lock = threading.Lock()
+        os.makedirs(self._meta_dir, exist_ok=True)
+        os.makedirs(self._blob_dir, exist_ok=True)
+
+    @property
+    def _meta_dir(self) -> str:
+        return os.path.join(self.root, "meta")
+
+    @property
+    def _blob_dir(self) -> str:
+        return os.path.join(self.root, "blobs")
+
+    def _meta_path(self, file_id: str) -> str:
+        return os.path.join(self._meta_dir, f"{file_id}.json")
+
+    def _blob_path(self, sha256: str, name: str = "raw") -> str:
+        return os.path.join(self._blob_dir, sha256, name)
+
+    def _touch(self, sha256: str):
+        """Mark a blob directory as recently used (mtime drives LRU order)."""
+        try:
+            os.utime(os.path.join(self._blob_dir, sha256), None)
+        except FileNotFoundError:
+            pass
+
+    # ---- Metadata (keyed by Slack file id) ----
+    def get_metadata(self, file_id: str) -> Optional[Dict[str, Any]]:
+        """Return the cached entry `{"metadata", "sha256"}` for a file id, or None (missing/expired)."""
+        path = self._meta_path(file_id)
+        try:
+            with open(path, "r") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if time.time() - entry.get("cached_at", 0) > self.meta_ttl:
+            self._remove(path)
+            return None
+        return entry
+
+    def put_metadata(self, file_id: str, metadata: Dict[str, Any], sha256: Optional[str] = None):
+        entry = {"metadata": metadata, "sha256": sha256, "cached_at": time.time()}
+        _atomic_write(self._meta_path(file_id), json.dumps(entry).encode("utf-8"))
+
+    # ---- Raw bytes (keyed by content hash) ----
+    def get_bytes(self, sha256: str) -> Optional[bytes]:
+        try:
+            with open(self._blob_path(sha256), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        self._touch(sha256)
+        return data
+
+    def put_bytes(self, data: bytes) -> str:
+        """
+        Store raw bytes and return their sha256 content hash.
+        Files larger than the whole cache are hashed but not stored.
+        """
+        sha256 = hashlib.sha256(data).hexdigest()
+        if len(data) > self.max_bytes:
+            print(f"⚠ File {sha256[:12]} ({len(data)} bytes) exceeds cache size, not caching")
+            return sha256
+        path = self._blob_path(sha256)
+        if not os.path.exists(path):
+            _atomic_write(path, data)
+            self._evict()
+        self._touch(sha256)
+        return sha256
+
+    def blob_path(self, sha256: str) -> Optional[str]:
+        """Local path of the cached raw bytes, if present."""
+        path = self._blob_path(sha256)
+        return path if os.path.exists(path) else None
+
+    # ---- Derived artifacts (keyed by content hash + artifact name) ----
+    def get_artifact(self, sha256: str, name: str) -> Optional[Any]:
+        """Return a JSON-serialisable artifact (parsed profile, summary, reply ...)."""
+        try:
+            with open(self._blob_path(sha256, f"{name}.json"), "r") as f:
+                value = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        self._touch(sha256)
+        return value
+
+    def put_artifact(self, sha256: str, name: str, value: Any):
+        _atomic_write(
+            self._blob_path(sha256, f"{name}.json"),
+            json.dumps(value, default=str).encode("utf-8"),
+        )
+        self._touch(sha256)
+        self._evict()
+
+    def get_result(self, sha256: str) -> Optional[Dict[str, Any]]:
+        """Workflow output stored for this content, if any."""
+        return self.get_artifact(sha256, "result")
+
+    def put_result(self, sha256: str, result: Dict[str, Any]) -> bool:
+        """
+        Store the RESULT_KEYS of a workflow run for this content.
+        Runs that did not answer (unknown intent) are not stored.
+        """
+        if result.get("intent") in UNANSWERED_INTENTS:
+            return False
+        self.put_artifact(sha256, "result", {k: result[k] for k in RESULT_KEYS if k in result})
+        return True
+
+    # ---- Consumers that need the file contents ----
+    def fetch_bytes(self, file_id: str, file_meta: Dict[str, Any], token: str, session=None) -> Tuple[str, bytes]:
+        """
+        Return (sha256, bytes) for a Slack file, downloading it only if the
+        content isn't cached yet. Records the hash against the file id so
+        later shares of this file can find stored artifacts.
+        """
+        entry = self.get_metadata(file_id) or {}
+        sha256 = entry.get("sha256")
+        data = self.get_bytes(sha256) if sha256 else None
+        if data is None:
+            data = download_slack_file(file_meta, token, session=session)
+            sha256 = self.put_bytes(data)
+        if entry.get("sha256") != sha256:
+            self.put_metadata(file_id, file_meta, sha256)
+        return sha256, data
+
+    # ---- Eviction ----
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _prune_metadata(self):
+        """Delete metadata entries older than `meta_ttl` (by file mtime = write time)."""
+        cutoff = time.time() - self.meta_ttl
+        for name in os.listdir(self._meta_dir):
+            path = os.path.join(self._meta_dir, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    self._remove(path)
+            except FileNotFoundError:
+                continue
+
+    def _evict(self):
+        """Expire old metadata, then drop least-recently-used blob directories until under `max_bytes`."""
+        with self._lock:
+            self._prune_metadata()
+            entries = []
+            total = 0
+            for sha256 in os.listdir(self._blob_dir):
+                blob = os.path.join(self._blob_dir, sha256)
+                try:
+                    size = sum(
+                        os.path.getsize(os.path.join(blob, name)) for name in os.listdir(blob)
+                    )
+                    entries.append((os.path.getmtime(blob), size, blob))
+                except FileNotFoundError:
+                    continue  # evicted concurrently by another worker
+                total += size
+
+            for _, size, blob in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                shutil.rmtree(blob, ignore_errors=True)
+                total -= size
+                print(f"🧹 Evicted cached file blob {os.path.basename(blob)}")
+
+
+def download_slack_file(file_meta: Dict[str, Any], token: str, session=None) -> bytes:
+    """
+    Download a Slack file's bytes using the bot token.
+    Uses `url_private_download` (falls back to `url_private`).
+    """
+    url = file_meta.get("url_private_download") or file_meta.get("url_private")
+    if not url:
+        raise ValueError(f"No download URL for Slack file {file_meta.get('id')}")
+
+    http = session or requests
+    resp = http.get(url, headers={"Authorization": f"Bearer {token}"}, timeout=30)
+    resp.raise_for_status()
+    return resp.content
+
+
+def reply_text(result: Dict[str, Any]) -> Optional[str]:
+    """
+    Text to post for a workflow result: "response" if a node set it, else
+    "result" (what the action nodes set). None if the request wasn't answered.
+    """
+    if result.get("intent") in UNANSWERED_INTENTS:
+        return None
+    return result.get("response") or result.get("result")
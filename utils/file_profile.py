@@ -0,0 +1,61 @@
+# utils/file_profile.py
+import io
+import os
+from typing import Any, Dict
+
+import pandas as pd
+
+TABLE_TYPES = {"csv": ",", "tsv": "\t"}
+TEXT_TYPES = ("text", "markdown", "json", "yaml", "xml", "html", "python", "sql")
+SAMPLE_ROWS = 5
+PREVIEW_CHARS = 4000
+
+
+def _filetype(file_meta: Dict[str, Any]) -> str:
+    filetype = (file_meta.get("filetype") or "").lower()
+    if filetype:
+        return filetype
+    return os.path.splitext(file_meta.get("name") or "")[1].lstrip(".").lower()
+
+
+def profile_file(data: bytes, file_meta: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Parse a shared file into a small JSON-serialisable profile, the input
+    for LLM summaries (and the "profile" artifact of SlackFileCache).
+
+    Tables (csv/tsv) get shape, per-column dtype/null counts, numeric
+    stats and a few sample rows; text files get line counts and a preview.
+    """
+    filetype = _filetype(file_meta)
+    profile: Dict[str, Any] = {
+        "name": file_meta.get("name"),
+        "title": file_meta.get("title"),
+        "filetype": filetype,
+        "size_bytes": len(data),
+    }
+
+    if filetype in TABLE_TYPES:
+        df = pd.read_csv(io.BytesIO(data), sep=TABLE_TYPES[filetype])
+        numeric = df.select_dtypes("number")
+        profile.update({
+            "kind": "table",
+            "rows": len(df),
+            "columns": [
+                {"name": str(col), "dtype": str(df[col].dtype), "nulls": int(df[col].isna().sum())}
+                for col in df.columns
+            ],
+            "numeric_stats": numeric.describe().round(4).to_dict() if not numeric.empty else {},
+            "sample": df.head(SAMPLE_ROWS).astype(str).to_dict("records"),
+        })
+    elif filetype in TEXT_TYPES or (file_meta.get("mimetype") or "").startswith("text/"):
+        text = data.decode("utf-8", errors="replace")
+        profile.update({
+            "kind": "text",
+            "lines": text.count("\n") + 1,
+            "chars": len(text),
+            "preview": text[:PREVIEW_CHARS],
+        })
+    else:
+        profile["kind"] = "binary"
+
+    return profile
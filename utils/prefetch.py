@@ -0,0 +1,125 @@
+# utils/prefetch.py
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="prefetch")
+_stats = {"started": 0, "used": 0, "cancelled": 0, "failed": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(field: str, amount: int = 1):
+    with _stats_lock:
+        _stats[field] += amount
+
+
+def prefetch_stats() -> Dict[str, int]:
+    with _stats_lock:
+        return dict(_stats)
+
+
+class Prefetch:
+    """
+    Slack data fetched speculatively while the workflow classifies the request.
+    Nodes call get(name); anything nobody asked for is dropped by cancel().
+    """
+
+    def __init__(self):
+        self._futures: Dict[str, Future] = {}
+
+    def submit(self, name: str, fn, *args, **kwargs):
+        self._futures[name] = _executor.submit(fn, *args, **kwargs)
+        _count("started")
+
+    def get(self, name: str) -> Optional[Any]:
+        """
+        Wait for a prefetched value. Returns None if it was never started or
+        failed, so callers fall back to fetching it themselves.
+        """
+        future = self._futures.pop(name, None)
+        if future is None:
+            return None
+        try:
+            value = future.result()
+        except Exception as e:
+            print(f"⚠ Prefetch {name} failed: {e}")
+            _count("failed")
+            return None
+        _count("used")
+        return value
+
+    def cancel(self):
+        """
+        Drop unused prefetches. Only calls still queued on the executor are
+        skipped: a call already running - including one blocked in the
+        client's rate-limit bucket.acquire() - cannot be interrupted, so it
+        still spends its Slack budget and its result is discarded.
+        """
+        for future in self._futures.values():
+            future.cancel()
+            _count("cancelled")
+        self._futures.clear()
+
+
+def _thread_to_prefetch(state: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+    """(channel_id, thread_ts) when the listener flagged the thread as worth prefetching."""
+    channel_id = state.get("channel_id")
+    thread_ts = state.get("thread_ts")
+    if state.get("prefetch_thread") and channel_id and thread_ts:
+        return channel_id, thread_ts
+    return None
+
+
+def start_prefetch(state: Dict[str, Any], slack_client) -> Optional[Prefetch]:
+    """
+    Start fetching the thread history while the workflow classifies the
+    request. Only done for bot mentions inside a thread (state["prefetch_thread"]):
+    conversations.replies is a Tier 3 method, so prefetching every thread
+    message would starve the calls that are actually needed.
+    Returns None when there is nothing worth prefetching.
+    """
+    thread = _thread_to_prefetch(state)
+    if thread is None:
+        return None
+
+    channel_id, thread_ts = thread
+    prefetch = Prefetch()
+    prefetch.submit("thread_replies", slack_client.conversations_replies, channel=channel_id, ts=thread_ts)
+    return prefetch
+
+
+class AsyncPrefetch(Prefetch):
+    """
+    Prefetch backed by asyncio tasks; get() is awaitable. cancel() cancels
+    the tasks, including calls still waiting on a rate-limit bucket.
+    """
+
+    def submit(self, name: str, coro):
+        self._futures[name] = asyncio.ensure_future(coro)
+        _count("started")
+
+    async def get(self, name: str) -> Optional[Any]:
+        task = self._futures.pop(name, None)
+        if task is None:
+            return None
+        try:
+            value = await task
+        except Exception as e:
+            print(f"⚠ Prefetch {name} failed: {e}")
+            _count("failed")
+            return None
+        _count("used")
+        return value
+
+
+def start_async_prefetch(state: Dict[str, Any], slack_client) -> Optional[AsyncPrefetch]:
+    """start_prefetch for the async graph; slack_client is an AsyncSlackClient."""
+    thread = _thread_to_prefetch(state)
+    if thread is None:
+        return None
+
+    channel_id, thread_ts = thread
+    prefetch = AsyncPrefetch()
+    prefetch.submit("thread_replies", slack_client.conversations_replies(channel=channel_id, ts=thread_ts))
+    return prefetch
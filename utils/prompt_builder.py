@@ -0,0 +1,185 @@
+# utils/prompt_builder.py
+import math
+import re
+import threading
+from functools import lru_cache
+from typing import Any, Dict, List
+
+try:
+    import tiktoken
+except ImportError:  # fall back to a ~4 chars/token estimate
+    tiktoken = None
+
+_encodings: Dict[str, Any] = {}
+
+
+def _encoding(model: str):
+    if model not in _encodings:
+        try:
+            _encodings[model] = tiktoken.encoding_for_model(model)
+        except KeyError:
+            _encodings[model] = tiktoken.get_encoding("o200k_base")
+    return _encodings[model]
+
+
+def count_tokens(text: str, model: str = "gpt-4o") -> int:
+    """Count tokens locally (tiktoken when installed, else an estimate)."""
+    if not text:
+        return 0
+    if tiktoken is None:
+        return math.ceil(len(text) / 4)
+    return len(_encoding(model).encode(text))
+
+
+def truncate_tokens(text: str, budget: int, model: str = "gpt-4o") -> str:
+    """Keep the start of `text` up to `budget` tokens."""
+    if budget <= 0:
+        return ""
+    if tiktoken is None:
+        return text[: budget * 4]
+    tokens = _encoding(model).encode(text)
+    return text if len(tokens) <= budget else _encoding(model).decode(tokens[:budget])
+
+
+def split_sections(markdown: str) -> List[str]:
+    """Split markdown into sections at '## ' headings (preamble kept first)."""
+    parts = re.split(r"(?m)^(?=## )", markdown)
+    return [p.strip() for p in parts if p.strip()]
+
+
+@lru_cache(maxsize=128)
+def fit_sections(context: str, budget: int, model: str = "gpt-4o") -> str:
+    """
+    Trim a context document to `budget` tokens by keeping whole sections in
+    document order (preamble first), skipping any that no longer fit.
+    Depends only on the context, so each channel always gets the same text.
+    """
+    if count_tokens(context, model) <= budget:
+        return context
+
+    chosen, used = [], 0
+    for section in split_sections(context):
+        cost = count_tokens(section, model)
+        if used + cost <= budget:
+            chosen.append(section)
+            used += cost
+    return "\n\n".join(chosen)
+
+
+class PromptBuilder:
+    """
+    Assembles chat messages in a prefix-stable order for provider prompt caching:
+
+        system: static instructions -> per-channel context
+        user:   per-request text
+
+    The static part is byte-identical across calls and the context part is
+    identical per channel, so repeated calls share the longest possible
+    prefix. The context gets a fixed `context_budget` (see fit_sections),
+    never shrunk for a long request; the request gets what is left of
+    `max_prompt_tokens` and loses its oldest lines (after the first) if it
+    doesn't fit.
+    """
+
+    def __init__(
+        self,
+        node: str,
+        instructions: str,
+        context_header: str = "Context:",
+        max_prompt_tokens: int = 4000,
+        context_budget: int = 1000,
+        model: str = "gpt-4o",
+    ):
+        self.node = node
+        self.instructions = instructions.strip()
+        self.context_header = context_header
+        self.max_prompt_tokens = max_prompt_tokens
+        self.context_budget = context_budget
+        self.model = model
+
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "trimmed_calls": 0}
+        PROMPT_BUILDERS[node] = self
+
+    def _fit_request(self, request_text: str, budget: int) -> str:
+        """
+        Keep the first line (the request header / thread parent message) and
+        as many of the newest lines as fit; a line that alone exceeds what is
+        left is cut. Each line is tokenized once.
+        """
+        lines = request_text.splitlines()
+        if not lines:
+            return ""
+        costs = [count_tokens(line, self.model) + 1 for line in lines]  # +1 for the newline
+
+        head = lines[0]
+        if costs[0] > budget:
+            return truncate_tokens(head, budget, self.model)
+        remaining = budget - costs[0]
+
+        kept = []
+        for line, cost in zip(reversed(lines[1:]), reversed(costs[1:])):
+            if cost > remaining:
+                if not kept:
+                    partial = truncate_tokens(line, remaining - 1, self.model)
+                    if partial:
+                        kept.append(partial)
+                break
+            kept.append(line)
+            remaining -= cost
+        return "\n".join([head] + kept[::-1])
+
+    def build(self, request_text: str, context: str = "") -> List[Dict[str, str]]:
+        """Return the messages list for chat.completions.create."""
+        system = self.instructions
+        trimmed = False
+        if context:
+            fitted = fit_sections(context, self.context_budget, self.model)
+            trimmed = fitted != context
+            if fitted:
+                system += f"\n\n{self.context_header}\n{fitted}"
+
+        budget = self.max_prompt_tokens - count_tokens(system, self.model)
+        if count_tokens(request_text, self.model) > budget:
+            request_text = self._fit_request(request_text, budget)
+            trimmed = True
+
+        if trimmed:
+            with self._lock:
+                self._stats["trimmed_calls"] += 1
+
+        return [
+            {"role": "system", "content": system},
+            {"role": "user", "content": request_text},
+        ]
+
+    def record_usage(self, response) -> None:
+        """Track prompt tokens and provider cache hits from an OpenAI response."""
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = (getattr(details, "cached_tokens", 0) or 0) if details else 0
+
+        with self._lock:
+            self._stats["calls"] += 1
+            self._stats["prompt_tokens"] += prompt_tokens
+            self._stats["cached_tokens"] += cached_tokens
+        ratio = cached_tokens / prompt_tokens if prompt_tokens else 0.0
+        print(f"🧮 {self.node}: {prompt_tokens} prompt tokens, {ratio:.0%} cached")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["cached_ratio"] = stats["cached_tokens"] / stats["prompt_tokens"] if stats["prompt_tokens"] else 0.0
+        return stats
+
+
+# node name -> builder, for reporting
+PROMPT_BUILDERS: Dict[str, PromptBuilder] = {}
+
+
+def prompt_stats() -> Dict[str, Dict[str, Any]]:
+    """Per-node prompt token and cached-token ratio totals."""
+    return {node: builder.stats() for node, builder in PROMPT_BUILDERS.items()}
@@ -0,0 +1,114 @@
+# utils/single_flight.py
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+def _report(name: str, stats: Dict[str, Any]):
+    print(
+        f"🔁 [{name}] Coalesced duplicate request "
+        f"({stats['coalesced']}/{stats['calls']}, rate {stats['coalesce_rate']:.0%})"
+    )
+
+
+class _Call:
+    """One in-flight execution that duplicates can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key: the first caller (leader)
+    runs `fn`, later callers with the same key wait for it and get the same
+    result (or exception). Once the leader finishes the key is released, so
+    later calls run fresh - this is de-duplication, not a cache.
+    """
+
+    def __init__(self, name: str = "single-flight"):
+        self.name = name
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, _Call] = {}
+        self._calls = 0
+        self._coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run fn() once per in-flight key.
+
+        Returns:
+            (result, is_leader) - is_leader is False for coalesced callers
+        """
+        with self._lock:
+            self._calls += 1
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _Call()
+            else:
+                self._coalesced += 1
+
+        if not leader:
+            _report(self.name, self.stats())
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, False
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            call.done.set()
+        return call.result, True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            calls, coalesced = self._calls, self._coalesced
+            inflight = len(self._inflight)
+        return {
+            "calls": calls,
+            "coalesced": coalesced,
+            "coalesce_rate": coalesced / calls if calls else 0.0,
+            "inflight": inflight,
+        }
+
+
+class AsyncSingleFlight(SingleFlight):
+    """
+    SingleFlight for coroutines on one event loop: duplicates await the
+    leader's task instead of blocking a thread. Same stats() as SingleFlight.
+    """
+
+    def __init__(self, name: str = "single-flight"):
+        super().__init__(name)
+        self._tasks: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        with self._lock:
+            self._calls += 1
+            task = self._tasks.get(key)
+            leader = task is None
+            if leader:
+                task = self._tasks[key] = asyncio.ensure_future(fn())
+                self._inflight[key] = task
+                task.add_done_callback(lambda _: self._release(key))
+            else:
+                self._coalesced += 1
+
+        if not leader:
+            _report(self.name, self.stats())
+        # shield: one cancelled requester must not cancel the shared execution
+        return await asyncio.shield(task), leader
+
+    def _release(self, key: Hashable):
+        with self._lock:
+            self._tasks.pop(key, None)
+            self._inflight.pop(key, None)
@@ -0,0 +1,455 @@
+# utils/slack_client.py
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+
+# Point at a local fake Slack API in tests, e.g. http://localhost:8080/api/
+SLACK_API_URL = os.environ.get("SLACK_API_URL", "https://slack.com/api/")
+
+# Slack Web API tiers -> requests per minute
+TIER_RATES = {1: 1, 2: 20, 3: 50, 4: 100}
+METHOD_TIERS = {
+    "conversations.replies": 3,
+    "conversations.history": 3,
+    "files.info": 4,
+    "users.info": 4,
+    "auth.test": 4,
+}
+DEFAULT_TIER = 3
+# chat.postMessage is "special": ~1 message per second per channel, short bursts allowed
+POST_MESSAGE_RATE = 1.0
+POST_MESSAGE_BURST = 3
+# Slack limits are per workspace/app, not per process: with N worker processes
+# plus the listener, set SLACK_PROCESSES=N+1 so each takes 1/(N+1) of every budget
+SLACK_PROCESSES_ENV = "SLACK_PROCESSES"
+# Seconds between per-process Slack call/throttle stats logs (0 = off)
+STATS_LOG_INTERVAL = float(os.environ.get("SLACK_STATS_LOG_INTERVAL", "300"))
+
+
+class SlackAPIError(Exception):
+    """Raised when Slack answers with ok=false."""
+
+    def __init__(self, method: str, response: Dict[str, Any]):
+        self.method = method
+        self.response = response
+        super().__init__(f"{method} failed: {response.get('error', 'unknown_error')}")
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. acquire() blocks the calling thread until a
+    token is free; acquire_async() waits with asyncio.sleep, so sync and
+    async callers draw from the same budget without blocking the event loop.
+    """
+
+    def __init__(self, rate_per_sec: float, capacity: float):
+        self.rate = rate_per_sec
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> float:
+        """Take a token if one is free and return 0, else return the seconds until one is."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self) -> float:
+        """Take one token. Returns the number of seconds spent waiting."""
+        waited = 0.0
+        while True:
+            delay = self.try_acquire()
+            if not delay:
+                return waited
+            time.sleep(delay)
+            waited += delay
+
+    async def acquire_async(self) -> float:
+        """acquire() for asyncio code: waits with asyncio.sleep."""
+        waited = 0.0
+        while True:
+            delay = self.try_acquire()
+            if not delay:
+                return waited
+            await asyncio.sleep(delay)
+            waited += delay
+
+    def pause(self, seconds: float):
+        """Drain the bucket so nobody calls again for `seconds` (Retry-After)."""
+        with self._lock:
+            self._tokens = 1 - seconds * self.rate
+            self._updated = time.monotonic()
+
+
+class _MergeBatch:
+    """Texts sent as one chat.postMessage; callers that joined wait on `done`."""
+
+    def __init__(self, text: str):
+        self.texts: List[str] = [text]
+        self.done = threading.Event()
+        self.response = None
+        self.error = None
+
+
+class _AsyncMergeBatch(_MergeBatch):
+    def __init__(self, text: str):
+        super().__init__(text)
+        self.done = asyncio.Event()
+
+
+def _join_thread(threads: Dict[tuple, list], key: tuple, text: str, batch_cls=_MergeBatch):
+    """
+    Place a post to a thread: returns (batch, role, previous) where role is
+    "post" (send `batch`, after `previous` completes if set), "merged" or
+    "deduplicated" (wait for `batch`).
+    """
+    thread = threads.get(key)
+    if thread is None:
+        # Nothing in flight for this thread -> post immediately
+        batch = batch_cls(text)
+        threads[key] = [batch, None]
+        return batch, "post", None
+
+    current, pending = thread
+    duplicate = next((b for b in (current, pending) if b and text in b.texts), None)
+    if duplicate is not None:
+        return duplicate, "deduplicated", None
+    if pending is not None:
+        pending.texts.append(text)
+        return pending, "merged", None
+    # First post behind the in-flight one: send the batch once it completes
+    batch = thread[1] = batch_cls(text)
+    return batch, "post", current
+
+
+def _advance_thread(threads: Dict[tuple, list], key: tuple):
+    """The in-flight post finished: promote the pending batch, or forget the thread."""
+    thread = threads[key]
+    if thread[1] is None:
+        del threads[key]
+    else:
+        thread[0], thread[1] = thread[1], None
+
+
+def _form_data(params: Dict[str, Any]) -> Dict[str, str]:
+    # Slack takes form-encoded args; structured values (blocks, ...) go as JSON strings
+    return {
+        k: v if isinstance(v, str) else json.dumps(v)
+        for k, v in params.items()
+        if v is not None
+    }
+
+
+class SlackClient:
+    """
+    Shared Slack Web API client.
+
+    - per-method token buckets sized to Slack's rate-limit tiers
+      (chat.postMessage is limited per channel), scaled by `rate_share`,
+      this process's share of the app-wide budget
+    - automatic Retry-After handling on HTTP 429
+    - one pooled requests.Session for all calls (and file downloads)
+    - optional merging of posts to a thread that arrive while a post to
+      that thread is still in flight (identical texts are sent once)
+    - call/throttle counters via stats()
+
+    Exposes the WebClient methods the nodes use, returning plain dicts.
+    """
+
+    def __init__(
+        self,
+        token: str,
+        base_url: str = SLACK_API_URL,
+        pool_size: int = 10,
+        max_retries: int = 3,
+        timeout: float = 30.0,
+        rate_share: float = 1.0,
+    ):
+        self.token = token
+        self.rate_share = rate_share
+        self.pool_size = pool_size
+        self.base_url = base_url if base_url.endswith("/") else base_url + "/"
+        self.max_retries = max_retries
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers["Authorization"] = f"Bearer {token}"
+
+        self._buckets: Dict[tuple, TokenBucket] = {}
+        self._buckets_lock = threading.Lock()
+        # (channel, thread_ts) -> [batch being posted, batch waiting for it or None]
+        self._merge_threads: Dict[tuple, List[Optional[_MergeBatch]]] = {}
+        self._merge_lock = threading.Lock()
+
+        self._stats: Dict[str, Dict[str, float]] = defaultdict(
+            lambda: {"calls": 0, "throttled": 0, "throttle_wait_s": 0.0, "rate_limited": 0,
+                     "merged": 0, "deduplicated": 0}
+        )
+        self._stats_lock = threading.Lock()
+
+    # ---- Rate limiting ----
+    def _bucket(self, method: str, channel: Optional[str] = None) -> TokenBucket:
+        key = (method, channel) if method == "chat.postMessage" else (method,)
+        with self._buckets_lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                share = self.rate_share
+                if method == "chat.postMessage":
+                    bucket = TokenBucket(POST_MESSAGE_RATE * share, max(1, POST_MESSAGE_BURST * share))
+                else:
+                    per_minute = TIER_RATES[METHOD_TIERS.get(method, DEFAULT_TIER)] * share
+                    # Allow a short burst of up to 10% of the per-minute budget
+                    bucket = TokenBucket(per_minute / 60.0, max(1, per_minute // 10))
+                self._buckets[key] = bucket
+            return bucket
+
+    def _count(self, method: str, field: str, amount: float = 1):
+        with self._stats_lock:
+            self._stats[method][field] += amount
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-method counters: calls, throttled, throttle_wait_s, rate_limited, merged, deduplicated."""
+        with self._stats_lock:
+            return {method: dict(counts) for method, counts in self._stats.items()}
+
+    # ---- Core call ----
+    def api_call(self, method: str, **params) -> Dict[str, Any]:
+        """POST a Web API method, respecting tier limits and Retry-After."""
+        bucket = self._bucket(method, params.get("channel"))
+        data = _form_data(params)
+
+        for attempt in range(self.max_retries + 1):
+            waited = bucket.acquire()
+            if waited:
+                self._count(method, "throttled")
+                self._count(method, "throttle_wait_s", waited)
+            self._count(method, "calls")
+
+            resp = self.session.post(self.base_url + method, data=data, timeout=self.timeout)
+            if resp.status_code == 429:
+                self._count(method, "rate_limited")
+                if attempt == self.max_retries:
+                    break
+                retry_after = float(resp.headers.get("Retry-After", 1))
+                print(f"⏳ Slack rate-limited {method}, retrying in {retry_after:.0f}s")
+                bucket.pause(retry_after)
+                continue
+
+            resp.raise_for_status()
+            body = resp.json()
+            if not body.get("ok"):
+                raise SlackAPIError(method, body)
+            return body
+
+        raise SlackAPIError(method, {"ok": False, "error": "ratelimited"})
+
+    # ---- WebClient-compatible methods ----
+    def chat_postMessage(self, channel: str, text: str = None, thread_ts: str = None,
+                         merge: bool = False, **kwargs) -> Dict[str, Any]:
+        """
+        Post a message. With merge=True, a plain-text post to a thread that
+        has no post in flight is sent right away; posts arriving while one is
+        in flight are combined into the next message (identical texts are
+        dropped), and every caller gets the response of the post carrying
+        its text.
+        """
+        if not merge or kwargs or not text:
+            return self.api_call("chat.postMessage", channel=channel, text=text, thread_ts=thread_ts, **kwargs)
+        return self._post_merged(channel, thread_ts, text)
+
+    def conversations_replies(self, channel: str, ts: str, **kwargs) -> Dict[str, Any]:
+        return self.api_call("conversations.replies", channel=channel, ts=ts, **kwargs)
+
+    def files_info(self, file: str, **kwargs) -> Dict[str, Any]:
+        return self.api_call("files.info", file=file, **kwargs)
+
+    def _post_merged(self, channel: str, thread_ts: Optional[str], text: str) -> Dict[str, Any]:
+        key = (channel, thread_ts)
+        with self._merge_lock:
+            batch, role, previous = _join_thread(self._merge_threads, key, text)
+
+        if role != "post":
+            self._count("chat.postMessage", role)
+            batch.done.wait()
+            if batch.error is not None:
+                raise batch.error
+            return batch.response
+
+        if previous is not None:
+            previous.done.wait()  # by now our batch has been promoted to in-flight
+        try:
+            batch.response = self.api_call(
+                "chat.postMessage", channel=channel, thread_ts=thread_ts, text="\n\n".join(batch.texts)
+            )
+        except Exception as e:
+            batch.error = e
+            raise
+        finally:
+            with self._merge_lock:
+                _advance_thread(self._merge_threads, key)
+            batch.done.set()
+        return batch.response
+
+
+class AsyncSlackClient:
+    """
+    asyncio Slack Web API client for the async listener and graph.
+
+    Calls go over an aiohttp session and wait for rate limits with
+    asyncio.sleep, so a throttled post never occupies a thread or delays
+    unrelated calls. Budgets are shared with the wrapped SlackClient: both
+    draw from the same TokenBucket objects (and Retry-After pauses) and
+    count into the same stats(). Post merging works as in SlackClient.
+
+    `session` is the SlackClient's requests session, for blocking file
+    downloads in nodes that run off the event loop.
+    """
+
+    def __init__(self, client: SlackClient):
+        self.client = client
+        self.token = client.token
+        self.session = client.session
+        self._http: Optional[aiohttp.ClientSession] = None
+        self._merge_threads: Dict[tuple, List[Optional[_AsyncMergeBatch]]] = {}
+
+    def _http_session(self) -> aiohttp.ClientSession:
+        # Created lazily: an aiohttp session belongs to the running event loop
+        if self._http is None or self._http.closed:
+            self._http = aiohttp.ClientSession(
+                headers={"Authorization": f"Bearer {self.token}"},
+                connector=aiohttp.TCPConnector(limit=self.client.pool_size),
+                timeout=aiohttp.ClientTimeout(total=self.client.timeout),
+            )
+        return self._http
+
+    async def close(self):
+        if self._http is not None and not self._http.closed:
+            await self._http.close()
+
+    async def api_call(self, method: str, **params) -> Dict[str, Any]:
+        """SlackClient.api_call without blocking the event loop."""
+        client = self.client
+        bucket = client._bucket(method, params.get("channel"))
+        data = _form_data(params)
+
+        for attempt in range(client.max_retries + 1):
+            waited = await bucket.acquire_async()
+            if waited:
+                client._count(method, "throttled")
+                client._count(method, "throttle_wait_s", waited)
+            client._count(method, "calls")
+
+            async with self._http_session().post(client.base_url + method, data=data) as resp:
+                if resp.status == 429:
+                    client._count(method, "rate_limited")
+                    if attempt == client.max_retries:
+                        break
+                    retry_after = float(resp.headers.get("Retry-After", 1))
+                    print(f"⏳ Slack rate-limited {method}, retrying in {retry_after:.0f}s")
+                    bucket.pause(retry_after)
+                    continue
+
+                resp.raise_for_status()
+                body = await resp.json(content_type=None)
+            if not body.get("ok"):
+                raise SlackAPIError(method, body)
+            return body
+
+        raise SlackAPIError(method, {"ok": False, "error": "ratelimited"})
+
+    async def chat_postMessage(self, channel: str, text: str = None, thread_ts: str = None,
+                               merge: bool = False, **kwargs) -> Dict[str, Any]:
+        """SlackClient.chat_postMessage, merging per thread on the event loop."""
+        if not merge or kwargs or not text:
+            return await self.api_call("chat.postMessage", channel=channel, text=text, thread_ts=thread_ts, **kwargs)
+        return await self._post_merged(channel, thread_ts, text)
+
+    async def conversations_replies(self, channel: str, ts: str, **kwargs) -> Dict[str, Any]:
+        return await self.api_call("conversations.replies", channel=channel, ts=ts, **kwargs)
+
+    async def files_info(self, file: str, **kwargs) -> Dict[str, Any]:
+        return await self.api_call("files.info", file=file, **kwargs)
+
+    async def _post_merged(self, channel: str, thread_ts: Optional[str], text: str) -> Dict[str, Any]:
+        key = (channel, thread_ts)
+        # Single event loop: no lock needed around the merge state
+        batch, role, previous = _join_thread(self._merge_threads, key, text, _AsyncMergeBatch)
+
+        if role != "post":
+            self.client._count("chat.postMessage", role)
+            await batch.done.wait()
+            if batch.error is not None:
+                raise batch.error
+            return batch.response
+
+        if previous is not None:
+            await previous.done.wait()
+        try:
+            batch.response = await self.api_call(
+                "chat.postMessage", channel=channel, thread_ts=thread_ts, text="\n\n".join(batch.texts)
+            )
+        except Exception as e:
+            batch.error = e
+            raise
+        finally:
+            _advance_thread(self._merge_threads, key)
+            batch.done.set()
+        return batch.response
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return self.client.stats()
+
+
+_clients: Dict[str, SlackClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_slack_client(token: str) -> SlackClient:
+    """
+    Process-wide shared SlackClient per bot token (so buckets are shared too).
+    Its rate share is 1/SLACK_PROCESSES of the app-wide Slack limits.
+    """
+    with _clients_lock:
+        if token not in _clients:
+            processes = max(1, int(os.environ.get(SLACK_PROCESSES_ENV, "1")))
+            _clients[token] = SlackClient(token, rate_share=1.0 / processes)
+            if len(_clients) == 1 and STATS_LOG_INTERVAL > 0:
+                threading.Thread(target=_log_stats_forever, daemon=True, name="slack-stats").start()
+        return _clients[token]
+
+
+def log_slack_stats():
+    """Print this process's per-method Slack call and throttling counters."""
+    with _clients_lock:
+        clients = list(_clients.values())
+    for client in clients:
+        for method, counts in sorted(client.stats().items()):
+            print(
+                f"📈 Slack {method} [pid {os.getpid()}]: {counts['calls']} calls, "
+                f"{counts['throttled']} throttled ({counts['throttle_wait_s']:.1f}s waited), "
+                f"{counts['rate_limited']} rate-limited, {counts['merged']} merged, "
+                f"{counts['deduplicated']} deduplicated"
+            )
+
+
+def _log_stats_forever():
+    while True:
+        time.sleep(STATS_LOG_INTERVAL)
+        log_slack_stats()
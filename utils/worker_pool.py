@@ -0,0 +1,374 @@
+# utils/worker_pool.py
+import itertools
+import multiprocessing as mp
+import signal
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import wait
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+# Keys copied back from a worker's final state (the rest may not be picklable)
+RESULT_KEYS = ("intent", "response", "result")
+
+
+def init_workflow() -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Default worker initializer: builds the workflow (warming the tool
+    datasets/caches once per process) and returns a state -> state runner.
+    """
+    from graph.workflow import build_graph, run_workflow
+    from utils.secrets_loader import load_secrets
+    from utils.slack_client import get_slack_client
+
+    secrets = load_secrets()
+    # Each worker has its own client, so Slack tier budgets are per process
+    slack_client = get_slack_client(secrets.get("SLACK_BOT_TOKEN"))
+    workflow = build_graph()
+    return lambda state: run_workflow(workflow, state, slack_client)
+
+
+def _worker_main(worker_id: int, conn, heartbeat_interval: float, init_worker):
+    """
+    Worker process entrypoint.
+    Calls `init_worker` once, then executes jobs received on `conn` (each on
+    its own thread, so duplicates routed here can coalesce) until it
+    receives None.
+    """
+    # The parent owns shutdown: Ctrl-C should drain, not kill workers mid-job
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    send_lock = threading.Lock()
+    stop = threading.Event()
+
+    def send(kind, job_id=None, payload=None):
+        with send_lock:
+            conn.send((kind, job_id, payload))
+
+    def heartbeat():
+        while not stop.wait(heartbeat_interval):
+            send("heartbeat")
+
+    # Start beating before the (slow) warm-up so loading isn't mistaken for a hang
+    threading.Thread(target=heartbeat, daemon=True).start()
+
+    run = init_worker()
+    send("ready")
+
+    def run_job(job_id, state):
+        try:
+            final_state = run(state)
+            payload = {k: final_state.get(k) for k in RESULT_KEYS if k in final_state}
+        except Exception as e:
+            print(f"⚠ Worker {worker_id} job {job_id} failed: {e}")
+            payload = {"response": f"⚠ Workflow error: {e}"}
+        send("done", job_id, payload)
+
+    jobs = []
+    while True:
+        job = conn.recv()
+        if job is None:
+            break
+        jobs = [t for t in jobs if t.is_alive()]
+        jobs.append(threading.Thread(target=run_job, args=job, daemon=True))
+        jobs[-1].start()
+
+    for t in jobs:
+        t.join()
+    stop.set()
+
+
+class WorkerPool:
+    """
+    Runs workflow executions in N worker processes behind one local queue.
+
+    The Slack listener stays in the parent process and submits picklable
+    State dicts; the pool hands each job to a worker over a private pipe
+    and passes the result to the callback registered with the job (which
+    posts the reply). Each worker runs up to `jobs_per_worker` jobs at once.
+    Jobs submitted with the same `route_key` as a job still running go to
+    that job's worker regardless of load, so the worker's single-flight
+    layer (graph.coalesce) can coalesce them; other jobs go to the least
+    loaded worker.
+
+    A supervisor thread restarts workers that exit, stop heartbeating
+    (whole process frozen) or run a job longer than `job_timeout` (e.g.
+    stuck on an OpenAI/boto3/Slack call), and logs the pool's health every
+    `health_log_interval` seconds.
+    """
+
+    def __init__(
+        self,
+        num_workers: int,
+        heartbeat_interval: float = 5.0,
+        heartbeat_timeout: float = 60.0,
+        job_timeout: float = 300.0,
+        jobs_per_worker: int = 4,
+        health_log_interval: float = 60.0,
+        callback_threads: int = 16,
+        init_worker: Callable[[], Callable] = init_workflow,
+    ):
+        self.num_workers = num_workers
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.job_timeout = job_timeout
+        self.jobs_per_worker = jobs_per_worker
+        self.health_log_interval = health_log_interval
+        self.init_worker = init_worker  # must be picklable (module-level function)
+
+        self._ctx = mp.get_context("spawn")
+        self._procs: Dict[int, Any] = {}
+        self._conns: Dict[int, Any] = {}
+        self._ready: Dict[int, bool] = {}
+        self._last_seen: Dict[int, float] = {}
+        # worker_id -> {job_id: (sent_at, route_key)}
+        self._inflight: Dict[int, Dict[int, Tuple[float, Optional[Hashable]]]] = {}
+        self._restarts: Dict[int, int] = {}
+
+        self._pending = deque()  # (job_id, state, route_key) not yet handed to a worker
+        self._callbacks: Dict[int, Callable[[Dict[str, Any]], None]] = {}
+
+        # Callbacks post to Slack (rate-limited, may block): never run them on the collector
+        self._callback_executor = ThreadPoolExecutor(
+            max_workers=callback_threads, thread_name_prefix="worker-pool-reply"
+        )
+
+        self._job_ids = itertools.count(1)
+        self._lock = threading.RLock()
+        self._accepting = False
+        self._stopping = threading.Event()
+
+    # ---- Lifecycle ----
+    def start(self):
+        for worker_id in range(self.num_workers):
+            self._spawn(worker_id)
+        self._accepting = True
+        threading.Thread(target=self._collect_results, daemon=True).start()
+        threading.Thread(target=self._supervise, daemon=True).start()
+        print(f"⚙️ Worker pool started with {self.num_workers} processes")
+
+    def _spawn(self, worker_id: int):
+        parent_conn, child_conn = self._ctx.Pipe()
+        proc = self._ctx.Process(
+            target=_worker_main,
+            args=(worker_id, child_conn, self.heartbeat_interval, self.init_worker),
+            name=f"dobby-worker-{worker_id}",
+        )
+        proc.start()
+        child_conn.close()
+        with self._lock:
+            self._procs[worker_id] = proc
+            self._conns[worker_id] = parent_conn
+            self._ready[worker_id] = False
+            self._last_seen[worker_id] = time.time()
+            self._inflight[worker_id] = {}
+
+    def drain(self, timeout: float = 30.0):
+        """
+        Stop accepting jobs, let workers finish queued and in-flight work,
+        then shut them down. Work still outstanding after `timeout` is
+        answered with an error and its workers are killed.
+        """
+        self._accepting = False
+        with self._lock:
+            print(f"🛑 Draining worker pool ({len(self._callbacks)} pending jobs)...")
+
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            with self._lock:
+                if not self._callbacks:
+                    break
+            time.sleep(0.1)
+
+        self._stopping.set()
+        with self._lock:
+            for conn in self._conns.values():
+                try:
+                    conn.send(None)
+                except (OSError, ValueError):
+                    pass
+            pending = list(self._callbacks.values())
+            self._callbacks.clear()
+            self._pending.clear()
+
+        for proc in self._procs.values():
+            proc.join(5)
+            if proc.is_alive():
+                proc.terminate()
+                proc.join()
+
+        for callback in pending:
+            self._run_callback(callback, {"response": "⚠ Bot is restarting, please retry."})
+        self._callback_executor.shutdown(wait=True)  # let queued replies finish posting
+        print("✅ Worker pool drained")
+
+    # ---- Jobs ----
+    def submit(self, state: Dict[str, Any], callback: Callable[[Dict[str, Any]], None],
+               route_key: Optional[Hashable] = None) -> int:
+        """
+        Queue a workflow run; callback(result) is called with its RESULT_KEYS.
+        Jobs sharing a route_key run in the same worker while one is in flight.
+        """
+        if not self._accepting:
+            raise RuntimeError("Worker pool is not accepting jobs")
+        job_id = next(self._job_ids)
+        with self._lock:
+            self._callbacks[job_id] = callback
+            self._pending.append((job_id, state, route_key))
+            self._assign()
+        return job_id
+
+    def _pick_worker(self, route_key: Optional[Hashable]) -> Optional[int]:
+        """Worker for a job: the one running its route_key, else the least loaded with a free slot."""
+        ready = [worker_id for worker_id in self._conns if self._ready[worker_id]]
+        if route_key is not None:
+            for worker_id in ready:
+                if any(key == route_key for _, key in self._inflight[worker_id].values()):
+                    return worker_id
+        free = [worker_id for worker_id in ready if len(self._inflight[worker_id]) < self.jobs_per_worker]
+        return min(free, key=lambda worker_id: len(self._inflight[worker_id]), default=None)
+
+    def _assign(self):
+        """Hand pending jobs to ready workers. Caller holds the lock."""
+        waiting = deque()
+        while self._pending:
+            job_id, state, route_key = job = self._pending.popleft()
+            worker_id = self._pick_worker(route_key)
+            if worker_id is None:
+                waiting.append(job)
+                continue
+            try:
+                self._conns[worker_id].send((job_id, state))
+            except (OSError, ValueError):
+                waiting.append(job)  # supervisor will restart the worker
+                continue
+            self._inflight[worker_id][job_id] = (time.time(), route_key)
+        self._pending = waiting
+
+    def _run_callback(self, callback, payload: Dict[str, Any]):
+        """Run a job callback on the reply threads, off the collector/supervisor threads."""
+        try:
+            self._callback_executor.submit(self._safe_callback, callback, payload)
+        except RuntimeError:  # executor already shut down by drain()
+            self._safe_callback(callback, payload)
+
+    def _safe_callback(self, callback, payload: Dict[str, Any]):
+        try:
+            callback(payload)
+        except Exception as e:
+            print(f"⚠ Worker pool callback error: {e}")
+
+    def _collect_results(self):
+        dead = set()  # pipes that hit EOF; their worker is restarted with a new pipe
+        while not self._stopping.is_set():
+            with self._lock:
+                conns = {conn: worker_id for worker_id, conn in self._conns.items()}
+            dead &= set(conns)
+            live = [conn for conn in conns if conn not in dead]
+            if not live:
+                time.sleep(0.1)
+                continue
+            try:
+                ready_conns = wait(live, timeout=1.0)
+            except (OSError, ValueError):
+                continue  # a connection was closed by a restart mid-wait
+            for conn in ready_conns:
+                worker_id = conns[conn]
+                try:
+                    kind, job_id, payload = conn.recv()
+                except (EOFError, OSError):
+                    dead.add(conn)  # worker died; the supervisor restarts it
+                    continue
+
+                callback = None
+                with self._lock:
+                    if self._conns.get(worker_id) is not conn:
+                        continue  # message from a replaced worker
+                    self._last_seen[worker_id] = time.time()
+                    if kind == "ready":
+                        self._ready[worker_id] = True
+                    elif kind == "done":
+                        self._inflight[worker_id].pop(job_id, None)
+                        callback = self._callbacks.pop(job_id, None)
+                    self._assign()
+
+                if callback:
+                    self._run_callback(callback, payload)
+
+    # ---- Health ----
+    def _check_worker(self, worker_id: int, proc, now: float) -> Optional[Tuple[str, str]]:
+        """Return (log reason, reply for its in-flight requests) if the worker must be restarted."""
+        if not proc.is_alive():
+            return f"exit code {proc.exitcode}", "⚠ Worker crashed while handling this request, please retry."
+        if now - self._last_seen.get(worker_id, now) > self.heartbeat_timeout:
+            return "unresponsive", "⚠ Worker crashed while handling this request, please retry."
+        for job_id, (sent_at, _) in self._inflight.get(worker_id, {}).items():
+            if now - sent_at > self.job_timeout:
+                return f"job {job_id} exceeded {self.job_timeout:.0f}s", "⚠ This request timed out, please retry."
+        return None
+
+    def _supervise(self):
+        last_health_log = time.time()
+        while not self._stopping.wait(self.heartbeat_interval):
+            now = time.time()
+            for worker_id, proc in list(self._procs.items()):
+                with self._lock:
+                    problem = self._check_worker(worker_id, proc, now)
+                if not problem:
+                    continue
+                if self._stopping.is_set():
+                    return
+
+                reason, reply = problem
+                print(f"💥 Worker {worker_id} {reason}, restarting...")
+                if proc.is_alive():
+                    proc.terminate()
+                proc.join()
+
+                with self._lock:
+                    callbacks = [self._callbacks.pop(job_id, None) for job_id in self._inflight[worker_id]]
+                    self._restarts[worker_id] = self._restarts.get(worker_id, 0) + 1
+                    self._conns[worker_id].close()
+                for callback in filter(None, callbacks):
+                    self._run_callback(callback, {"response": reply})
+                self._spawn(worker_id)
+
+            if now - last_health_log >= self.health_log_interval:
+                last_health_log = now
+                self._log_health()
+
+    def _log_health(self):
+        health = self.health()
+        workers = health["workers"].values()
+        ready = sum(1 for w in workers if w["alive"] and w["ready"])
+        restarts = sum(w["restarts"] for w in workers)
+        icon = "🩺" if health["healthy"] else "⚠"
+        print(
+            f"{icon} Worker pool: {ready}/{len(health['workers'])} ready, "
+            f"{health['queued_jobs']} queued, {health['pending_jobs']} pending, {restarts} restarts"
+        )
+
+    def health(self) -> Dict[str, Any]:
+        """Snapshot of worker liveness, heartbeat age, in-flight jobs and restarts."""
+        now = time.time()
+        with self._lock:
+            workers = {
+                worker_id: {
+                    "alive": proc.is_alive(),
+                    "ready": self._ready[worker_id],
+                    "heartbeat_age": round(now - self._last_seen.get(worker_id, now), 1),
+                    "inflight_jobs": sorted(self._inflight.get(worker_id, {})),
+                    "restarts": self._restarts.get(worker_id, 0),
+                }
+                for worker_id, proc in self._procs.items()
+            }
+            queued = len(self._pending)
+            pending = len(self._callbacks)
+        return {
+            "accepting": self._accepting,
+            "queued_jobs": queued,
+            "pending_jobs": pending,
+            "healthy": all(w["alive"] and w["heartbeat_age"] <= self.heartbeat_timeout for w in workers.values()),
+            "workers": workers,
+        }